@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,11 +10,102 @@ class Settings(BaseSettings):
     DB_NAME: str
     ADMIN_PASSWORD: str
     STOREKEEPER_PASSWORD: str
+    # Shared by every worker and instance, so a token signed by one is accepted by the others.
+    SESSION_SECRET: str = Field(min_length=32)
+
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER: bool = False
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_MAX_LAG: float = 5
+    DB_REPLICA_CHECK_INTERVAL: float = 5
+    DB_REPLICA_STICKY_SECONDS: int = 10
+
+    PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    EXPORT_BATCH_SIZE: int = 1000
+    STOCK_BULK_MAX_ROWS: int = 10_000
+    SEARCH_LIMIT: int = 10
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.3
+
+    SESSION_TTL_SECONDS: int = 8 * 3600
+    SESSION_COOKIE: str = "session"
+    SESSION_COOKIE_SECURE: bool = False
+    SESSION_CACHE_SIZE: int = 1024
+
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = 0
+    WEB_BACKLOG: int = 2048
+    WEB_KEEPALIVE_SECONDS: int = 5
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_WARMUP_CONNECTIONS: bool = True
+
+    TEMPLATE_AUTO_RELOAD: bool = False
+    TEMPLATE_CACHE_DIR: str = ""
+
+    DB_LISTEN_URL: str = ""
+    FEED_QUEUE_SIZE: int = 256
+    FEED_KEEPALIVE_SECONDS: float = 15
+    FEED_RECONNECT_SECONDS: float = 2
+
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_EVICT_INTERVAL: float = 600
+    IDEMPOTENCY_EVICT_BATCH: int = 10000
+
+    # A limit of 0 takes its share of DB_POOL_SIZE + DB_MAX_OVERFLOW, so admitted requests never wait on the pool.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_LIMIT: int = 0
+    ADMISSION_READ_QUEUE: int = 50
+    ADMISSION_WRITE_LIMIT: int = 0
+    ADMISSION_WRITE_QUEUE: int = 50
+    ADMISSION_REPORT_LIMIT: int = 0
+    ADMISSION_REPORT_QUEUE: int = 10
+    ADMISSION_QUEUE_TIMEOUT: float = 5
+    ADMISSION_RETRY_AFTER: int = 1
+    ADMISSION_REPORT_PREFIXES: str = ("/analytics,/exports,/storekeeper/products-info,/storekeeper/sales-info,"
+                                      "/storekeeper/stocks-info,/storekeeper/orders-info,/storekeeper/providers-info")
+    ADMISSION_EXEMPT_PREFIXES: str = "/static,/metrics,/storekeeper/events,/login,/token,/docs,/redoc,/openapi.json"
 
     @property
     def db_url(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def listen_url(self):
+        # LISTEN needs a session of its own, so it must bypass a transaction-pooling pgbouncer.
+        return (self.DB_LISTEN_URL or self.db_url).replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    @property
+    def replica_urls(self):
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def db_pool_capacity(self):
+        return self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW
+
+    @property
+    def admission_limits(self):
+        # Split like 6:5:4 of the default 15 connections; reads get whatever the other two classes leave.
+        report = self.ADMISSION_REPORT_LIMIT or max(1, self.db_pool_capacity * 4 // 15)
+        write = self.ADMISSION_WRITE_LIMIT or max(1, self.db_pool_capacity // 3)
+        read = self.ADMISSION_READ_LIMIT or max(1, self.db_pool_capacity - write - report)
+        return {"read": read, "write": write, "report": report}
+
+    @property
+    def admission_report_prefixes(self):
+        return tuple(prefix.strip() for prefix in self.ADMISSION_REPORT_PREFIXES.split(",") if prefix.strip())
+
+    @property
+    def admission_exempt_prefixes(self):
+        return tuple(prefix.strip() for prefix in self.ADMISSION_EXEMPT_PREFIXES.split(",") if prefix.strip())
+
     @property
     def admin_password(self):
         return self.ADMIN_PASSWORD
@@ -1,26 +1,71 @@
-import os
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from sqlalchemy.exc import SQLAlchemyError
 
-from routers import router as api_router
+from app.config import settings
+from app.middleware.admission import AdmissionMiddleware, admission
+from app.middleware.replica import ReadYourWritesMiddleware
+from app.middleware.timing import ServerTimingMiddleware, instrument
+from app.models.db_engine import engine
+from app.routers import router as api_router
+from app.templating import templates
+from app.utils.assets import STATIC_DIR, PrecompressedStaticFiles
+from app.utils.feed import feed
+from app.utils.idempotency import IdempotentReplay, idempotent_replay_handler, run_eviction
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger("app")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    count = templates.precompile()
+    logger.info(f"Precompiled {count} templates in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if settings.WEB_WARMUP_CONNECTIONS:
+        start = time.perf_counter()
+        try:
+            connections = await engine.warmup()
+            logger.info(f"Opened {connections} database connections in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except (SQLAlchemyError, OSError) as error:
+            # The pool still opens connections on demand, so a slow database only costs the first requests.
+            logger.warning(f"Database warmup failed: {error}")
+
+    admitted = sum(settings.admission_limits.values())
+    if settings.ADMISSION_ENABLED and admitted > settings.db_pool_capacity:
+        logger.warning(f"Admission limits allow {admitted} concurrent requests but the database pool holds only "
+                       f"{settings.db_pool_capacity} connections; admitted requests will queue on the pool")
+
+    eviction = asyncio.create_task(run_eviction(settings.IDEMPOTENCY_EVICT_INTERVAL, settings.IDEMPOTENCY_EVICT_BATCH))
+
     yield
 
+    eviction.cancel()
+    await feed.stop()
+    await engine.dispose()
+
 
 app = FastAPI(lifespan=lifespan)
+app.add_exception_handler(IdempotentReplay, idempotent_replay_handler)
+app.add_middleware(ServerTimingMiddleware)
+if engine.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
+for db_engine in engine.engines:
+    instrument(db_engine)
 
 app.include_router(api_router)
 
-app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
-templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Optional, Sequence
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.models.db_engine import PoolStats
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RouteClass:
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_stats = PoolStats()
+
+    async def acquire(self, timeout: float) -> bool:
+        start = time.perf_counter()
+
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+        elif self.waiting >= self.queue_size:
+            # Shed load up front: a full queue means the wait would outlast the client's patience anyway.
+            self.rejected += 1
+            return False
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.wait_stats.timeouts += 1
+                self.rejected += 1
+                return False
+            finally:
+                self.waiting -= 1
+
+        self.wait_stats.observe(time.perf_counter() - start)
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self.semaphore.release()
+
+    def status(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            **self.wait_stats.as_dict(),
+        }
+
+
+class AdmissionController:
+    def __init__(self, read: RouteClass, write: RouteClass, report: RouteClass, report_prefixes: Sequence[str],
+                 exempt_prefixes: Sequence[str], queue_timeout: float, retry_after: int):
+        self.classes = {route_class.name: route_class for route_class in (read, write, report)}
+        self.report_prefixes = tuple(report_prefixes)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+    def classify(self, method: str, path: str) -> Optional[RouteClass]:
+        if path.startswith(self.exempt_prefixes):
+            return None
+        if method not in SAFE_METHODS:
+            return self.classes["write"]
+        # Reports get their own slots, so a burst of them queues behind itself instead of in front of CRUD.
+        if path.startswith(self.report_prefixes):
+            return self.classes["report"]
+        return self.classes["read"]
+
+    def status(self) -> dict:
+        return {name: route_class.status() for name, route_class in self.classes.items()}
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = self.controller.classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await route_class.acquire(self.controller.queue_timeout):
+            response = JSONResponse({"detail": "Сервер перегружен, повторите запрос позже"}, status_code=503,
+                                    headers={"Retry-After": str(self.controller.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
+
+
+admission = AdmissionController(
+    read=RouteClass("read", settings.admission_limits["read"], settings.ADMISSION_READ_QUEUE),
+    write=RouteClass("write", settings.admission_limits["write"], settings.ADMISSION_WRITE_QUEUE),
+    report=RouteClass("report", settings.admission_limits["report"], settings.ADMISSION_REPORT_QUEUE),
+    report_prefixes=settings.admission_report_prefixes, exempt_prefixes=settings.admission_exempt_prefixes,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT, retry_after=settings.ADMISSION_RETRY_AFTER)
@@ -0,0 +1,107 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.requests")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "rows", "template_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def server_timing(self, total: float) -> str:
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+                f'tpl;dur={self.template_time * 1000:.2f}, '
+                f'app;dur={total * 1000:.2f}')
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context rather than the pooled connection, where the start of a statement that
+    # failed before after_cursor_execute would be left behind and taken for the next query's.
+    context.query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    observe(context, statement, max(cursor.rowcount, 0))
+
+
+def handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None and hasattr(context, "query_start"):
+        observe(context, exception_context.statement, 0)
+
+
+def observe(context, statement: str, rows: int) -> None:
+    elapsed = time.perf_counter() - context.query_start
+
+    stats = current_stats.get()
+    if stats is None:
+        return
+
+    stats.queries += 1
+    stats.db_time += elapsed
+    stats.rows += rows
+    stats.statements[statement] += 1
+
+
+def instrument(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            route = scope.get("route")
+
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "route": getattr(route, "path", scope["path"]),
+                "status": status,
+                "queries": stats.queries,
+                "rows": stats.rows,
+                "max_repeats": max(stats.statements.values(), default=0),
+                "db_ms": round(stats.db_time * 1000, 2),
+                "template_ms": round(stats.template_time * 1000, 2),
+                "total_ms": round((time.perf_counter() - start) * 1000, 2),
+            }, ensure_ascii=False))
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 
 Base = declarative_base()
@@ -12,7 +12,8 @@ class Order(Base):
     id: Mapped[int] = mapped_column("код", primary_key=True)
     product_quantity: Mapped[int] = mapped_column("количество_товаров")
     total_cost: Mapped[float] = mapped_column("сумма")
-    product_id: Mapped[int] = mapped_column("код_товара", ForeignKey("Товар.код"))
+    product_id: Mapped[int] = mapped_column("код_товара", ForeignKey("Товар.код"), index=True)
+    version: Mapped[int] = mapped_column("версия", server_default="1")
 
     product = relationship("Product", back_populates="orders")
     sales_records = relationship("SalesRecord", back_populates="order")
@@ -20,6 +21,11 @@ class Order(Base):
 
 class Description(Base):
     __tablename__ = "Описание"
+    __table_args__ = (
+        Index("ix_Описание_тип_мебели_код", "тип_мебели", "код"),
+        Index("ix_Описание_тип_мебели_trgm", "тип_мебели", postgresql_using="gin",
+              postgresql_ops={"тип_мебели": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
     furniture_type: Mapped[str] = mapped_column("тип_мебели")
@@ -32,6 +38,10 @@ class Description(Base):
 
 class Buyer(Base):
     __tablename__ = "Покупатель"
+    __table_args__ = (
+        Index("ix_Покупатель_ФИО_код", "ФИО", "код"),
+        Index("ix_Покупатель_ФИО_trgm", "ФИО", postgresql_using="gin", postgresql_ops={"ФИО": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
     full_name: Mapped[str] = mapped_column("ФИО")
@@ -44,6 +54,11 @@ class Buyer(Base):
 
 class Provider(Base):
     __tablename__ = "Поставщик"
+    __table_args__ = (
+        Index("ix_Поставщик_имя_организации_код", "имя_организации", "код"),
+        Index("ix_Поставщик_имя_организации_trgm", "имя_организации", postgresql_using="gin",
+              postgresql_ops={"имя_организации": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
     organization_name: Mapped[str] = mapped_column("имя_организации")
@@ -57,10 +72,11 @@ class Product(Base):
     __tablename__ = "Товар"
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
-    description_id: Mapped[int] = mapped_column("код_описания", ForeignKey("Описание.код"))
+    description_id: Mapped[int] = mapped_column("код_описания", ForeignKey("Описание.код"), index=True)
     price: Mapped[float] = mapped_column("цена")
     stock: Mapped[int] = mapped_column("количество_в_наличии")
-    provider_id: Mapped[int] = mapped_column("код_поставщика", ForeignKey("Поставщик.код"))
+    provider_id: Mapped[int] = mapped_column("код_поставщика", ForeignKey("Поставщик.код"), index=True)
+    version: Mapped[int] = mapped_column("версия", server_default="1")
 
     description = relationship("Description", back_populates="products")
     provider = relationship("Provider", back_populates="products")
@@ -73,8 +89,8 @@ class SalesRecord(Base):
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
     date: Mapped[datetime.date] = mapped_column("дата")
-    order_id: Mapped[int] = mapped_column("код_заказа", ForeignKey("Заказ.код"))
-    buyer_id: Mapped[int] = mapped_column("код_покупателя", ForeignKey("Покупатель.код"))
+    order_id: Mapped[int] = mapped_column("код_заказа", ForeignKey("Заказ.код"), index=True)
+    buyer_id: Mapped[int] = mapped_column("код_покупателя", ForeignKey("Покупатель.код"), index=True)
 
     buyer = relationship("Buyer", back_populates="sales_records")
     order = relationship("Order", back_populates="sales_records")
@@ -85,7 +101,35 @@ class StockRecord(Base):
 
     id: Mapped[int] = mapped_column("код", primary_key=True)
     date: Mapped[datetime.date] = mapped_column("дата")
-    product_id: Mapped[int] = mapped_column("код_товара", ForeignKey("Товар.код"))
+    product_id: Mapped[int] = mapped_column("код_товара", ForeignKey("Товар.код"), index=True)
     quantity: Mapped[int] = mapped_column("количество")
 
     product = relationship("Product", back_populates="stock_records")
+
+
+class SalesRollup(Base):
+    __tablename__ = "Сводка_продаж"
+
+    date: Mapped[datetime.date] = mapped_column("дата", primary_key=True)
+    product_id: Mapped[int] = mapped_column("код_товара", primary_key=True)
+    buyer_id: Mapped[int] = mapped_column("код_покупателя", primary_key=True)
+    quantity: Mapped[int] = mapped_column("количество", BigInteger, default=0)
+    revenue: Mapped[float] = mapped_column("выручка", default=0)
+    sales: Mapped[int] = mapped_column("продажи", BigInteger, default=0)
+
+
+class TableVersion(Base):
+    __tablename__ = "Версия_таблицы"
+
+    table: Mapped[str] = mapped_column("таблица", primary_key=True)
+    version: Mapped[int] = mapped_column("версия", BigInteger, default=0)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "Ключ_идемпотентности"
+
+    key: Mapped[str] = mapped_column("ключ", primary_key=True)
+    fingerprint: Mapped[str] = mapped_column("отпечаток_запроса")
+    status_code: Mapped[int] = mapped_column("код_ответа")
+    response: Mapped[str] = mapped_column("ответ")
+    created_at: Mapped[datetime.datetime] = mapped_column("создан", DateTime(timezone=True), index=True)
@@ -0,0 +1,64 @@
+import asyncio
+import sys
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.base import Base
+from app.models.db_engine import engine
+
+MISSING_FK_INDEXES = text("""
+    SELECT c.conrelid::regclass::text AS table_name,
+           c.conname AS constraint_name,
+           array_agg(a.attname ORDER BY k.n) AS columns
+    FROM pg_constraint c
+    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, n)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.contype = 'f'
+      AND c.connamespace = 'public'::regnamespace
+      AND NOT EXISTS (
+          SELECT 1
+          FROM pg_index i
+          WHERE i.indrelid = c.conrelid
+            AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] @> c.conkey
+      )
+    GROUP BY c.conrelid, c.conname
+    ORDER BY 1, 2
+""")
+
+
+def missing_fk_indexes(metadata: MetaData = Base.metadata) -> list[str]:
+    missing = []
+
+    for table in metadata.sorted_tables:
+        leading = [[column.name for column in index.columns] for index in table.indexes]
+        leading.append([column.name for column in table.primary_key.columns])
+
+        for constraint in table.foreign_key_constraints:
+            columns = [column.name for column in constraint.columns]
+            if not any(set(index[:len(columns)]) == set(columns) for index in leading):
+                missing.append(f"{table.name}({', '.join(columns)})")
+
+    return missing
+
+
+async def missing_fk_indexes_in_db(connection: AsyncConnection) -> list[str]:
+    result = await connection.execute(MISSING_FK_INDEXES)
+    return [f"{row.table_name}({', '.join(row.columns)})" for row in result]
+
+
+async def main() -> int:
+    models = missing_fk_indexes()
+    async with engine.engine.connect() as connection:
+        database = await missing_fk_indexes_in_db(connection)
+    await engine.dispose()
+
+    for source, missing in (("models", models), ("database", database)):
+        for columns in missing:
+            print(f"{source}: foreign key without index: {columns}")
+
+    return 1 if models or database else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
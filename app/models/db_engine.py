@@ -1,26 +1,199 @@
-from typing import AsyncGenerator
+import asyncio
+import bisect
+import itertools
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Sequence
 
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 
 from app.config import settings
 
+PRIMARY_COOKIE = "db_primary"
 
-class Engine:
-    def __init__(self, url: str,
-                 echo: bool = False, echo_pool: bool = False, max_overflow: int = 10, pool_size: int = 5):
-        self.engine: AsyncEngine = create_async_engine(url=url,
-                                                       echo=echo, echo_pool=echo_pool, max_overflow=max_overflow,
-                                                       pool_size=pool_size)
-        self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(bind=self.engine,
+REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float
+""")
+
+
+class PoolStats:
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.waits += 1
+        self.wait_time += seconds
+        self.histogram[bisect.bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+
+    def as_dict(self) -> dict:
+        bounds = [str(bound) for bound in self.BUCKETS_MS] + ["+Inf"]
+        return {
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "wait_time_ms": round(self.wait_time * 1000, 2),
+            "wait_histogram_ms": dict(zip(bounds, self.histogram)),
+        }
+
+
+class Database:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(bind=engine,
                                                                                     autoflush=False, autocommit=False,
                                                                                     expire_on_commit=False)
+        self.pool_stats = PoolStats()
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[AsyncSession]:
+        async with self.session_factory() as session:
+            start = time.perf_counter()
+            try:
+                await session.connection()
+            except TimeoutError:
+                self.pool_stats.timeouts += 1
+                raise
+            self.pool_stats.observe(time.perf_counter() - start)
+
+            yield session
+
+    async def warmup(self) -> int:
+        async def connect() -> None:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        # Held concurrently, so the pool has to open all of its persistent connections at once.
+        connections = self.engine.pool.size()
+        await asyncio.gather(*(connect() for _ in range(connections)))
+        return connections
+
+    def pool_status(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **self.pool_stats.as_dict(),
+        }
+
+
+class Replica(Database):
+    def __init__(self, engine: AsyncEngine):
+        super().__init__(engine)
+        self.lag = 0.0
+        self.healthy = True
+        self.checked_at = float("-inf")
+
+    async def refresh(self, interval: float) -> None:
+        now = time.monotonic()
+        if now - self.checked_at < interval:
+            return
+
+        # Claim the check before awaiting so concurrent requests keep using the last known state.
+        self.checked_at = now
+        try:
+            async with self.engine.connect() as connection:
+                self.lag = (await connection.execute(REPLICA_LAG)).scalar_one()
+            self.healthy = True
+        except (SQLAlchemyError, OSError):
+            self.healthy = False
+
+    def pool_status(self) -> dict:
+        return {"lag": self.lag, "healthy": self.healthy, **super().pool_status()}
+
+
+class Engine:
+    def __init__(self, url: str,
+                 echo: bool = False, echo_pool: bool = False, max_overflow: int = 10, pool_size: int = 5,
+                 pool_timeout: float = 30, pool_recycle: int = -1, pool_pre_ping: bool = False,
+                 statement_timeout_ms: int = 0, statement_cache_size: int = 100, pgbouncer: bool = False,
+                 replica_urls: Sequence[str] = (), replica_max_lag: float = 5, replica_check_interval: float = 5):
+        connect_args = {"statement_cache_size": statement_cache_size,
+                        "prepared_statement_cache_size": statement_cache_size}
+
+        if pgbouncer:
+            # Transaction pooling hands each transaction a different server connection, so named
+            # prepared statements can neither be cached nor reused.
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0,
+                                prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__")
+        if statement_timeout_ms:
+            connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+
+        def create(engine_url: str) -> AsyncEngine:
+            return create_async_engine(url=engine_url,
+                                       echo=echo, echo_pool=echo_pool, max_overflow=max_overflow,
+                                       pool_size=pool_size, pool_timeout=pool_timeout,
+                                       pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping,
+                                       connect_args=connect_args)
+
+        self.primary = Database(create(url))
+        self.engine: AsyncEngine = self.primary.engine
+        self.session_factory: async_sessionmaker[AsyncSession] = self.primary.session_factory
+
+        self.replicas = [Replica(create(replica_url)) for replica_url in replica_urls]
+        self.replica_max_lag = replica_max_lag
+        self.replica_check_interval = replica_check_interval
+        self._next_replica = itertools.count()
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [self.engine] + [replica.engine for replica in self.replicas]
+
+    async def warmup(self) -> int:
+        return sum(await asyncio.gather(*(database.warmup() for database in [self.primary, *self.replicas])))
 
     async def dispose(self) -> None:
-        await self.engine.dispose()
+        for engine in self.engines:
+            await engine.dispose()
 
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
-        async with self.session_factory() as session:
+        async with self.primary.checkout() as session:
+            yield session
+
+    async def read_database(self, use_primary: bool = False) -> Database:
+        if use_primary or not self.replicas:
+            return self.primary
+
+        start = next(self._next_replica)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            await replica.refresh(self.replica_check_interval)
+
+            if replica.healthy and replica.lag <= self.replica_max_lag:
+                return replica
+
+        return self.primary
+
+    async def get_read_session(self, request: Request) -> AsyncGenerator[AsyncSession, None]:
+        database = await self.read_database(use_primary=PRIMARY_COOKIE in request.cookies)
+
+        async with database.checkout() as session:
             yield session
 
+    def pool_status(self) -> dict:
+        status = {"primary": self.primary.pool_status()}
+        for number, replica in enumerate(self.replicas):
+            status[f"replica_{number}"] = replica.pool_status()
+        return status
+
 
-engine = Engine(url=str(settings.db_url))
+engine = Engine(url=str(settings.db_url), echo=settings.DB_ECHO, max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_size=settings.DB_POOL_SIZE, pool_timeout=settings.DB_POOL_TIMEOUT,
+                pool_recycle=settings.DB_POOL_RECYCLE, pool_pre_ping=settings.DB_POOL_PRE_PING,
+                statement_timeout_ms=settings.DB_STATEMENT_TIMEOUT_MS,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE, pgbouncer=settings.DB_PGBOUNCER,
+                replica_urls=settings.replica_urls, replica_max_lag=settings.DB_REPLICA_MAX_LAG,
+                replica_check_interval=settings.DB_REPLICA_CHECK_INTERVAL)
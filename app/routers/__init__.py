@@ -1,9 +1,12 @@
 from fastapi import APIRouter
 
 from .admin import router as admin_router
+from .analytics import router as analytics_router
 from .buyers import router as buyer_router
 from .descriptions import router as descriptions_router
+from .exports import router as exports_router
 from .login import router as login_router
+from .metrics import router as metrics_router
 from .orders import router as orders_router
 from .products import router as product_router
 from .providers import router as provider_router
@@ -23,3 +26,6 @@ router.include_router(stock_records_router)
 router.include_router(storekeeper_router)
 router.include_router(admin_router)
 router.include_router(login_router)
+router.include_router(exports_router)
+router.include_router(metrics_router)
+router.include_router(analytics_router)
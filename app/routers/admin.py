@@ -1,15 +1,11 @@
-from pathlib import Path
-
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi import Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
-router = APIRouter()
+from app.templating import templates
+from app.utils.session import require_role
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
+router = APIRouter(dependencies=[Depends(require_role("admin"))])
 
 
 @router.get("/admin", response_class=HTMLResponse)
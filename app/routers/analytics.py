@@ -0,0 +1,118 @@
+import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Date, Float, Subquery, cast, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import Buyer, Description, Product, SalesRollup
+from app.models.db_engine import engine
+from app.utils.negotiation import rows_to_dicts
+
+router = APIRouter(prefix='/analytics')
+
+
+def sales_facts(date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> Subquery:
+    query = select(SalesRollup.date.label("date"), SalesRollup.product_id.label("product_id"),
+                   SalesRollup.buyer_id.label("buyer_id"), SalesRollup.quantity.label("quantity"),
+                   SalesRollup.revenue.label("revenue"), SalesRollup.sales.label("sales"))
+
+    if date_from is not None:
+        query = query.where(SalesRollup.date >= date_from)
+    if date_to is not None:
+        query = query.where(SalesRollup.date <= date_to)
+
+    return query.subquery("facts")
+
+
+def totals(facts: Subquery) -> list:
+    revenue = func.sum(facts.c.revenue)
+    return [
+        revenue.label("revenue"),
+        func.sum(facts.c.quantity).label("quantity"),
+        func.sum(facts.c.sales).label("sales"),
+        # Window over the grouped rows: each bucket's share of the revenue in the whole result.
+        (revenue / func.nullif(func.sum(revenue).over(), 0, type_=Float)).label("share"),
+    ]
+
+
+async def fetch(session: AsyncSession, query) -> ORJSONResponse:
+    try:
+        result = await session.execute(query)
+        return ORJSONResponse(rows_to_dicts(result.all()))
+    except SQLAlchemyError as error:
+        raise HTTPException(status_code=500, detail="Ошибка при расчёте аналитики")
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
+
+
+@router.get('/revenue')
+async def revenue_by_period(period: Literal["day", "week", "month"] = "day",
+                            date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                            session: AsyncSession = Depends(engine.get_read_session)):
+    facts = sales_facts(date_from, date_to)
+    bucket = cast(func.date_trunc(period, facts.c.date), Date).label("period")
+
+    query = select(bucket, *totals(facts)).group_by(bucket).order_by(bucket)
+    return await fetch(session, query)
+
+
+@router.get('/furniture-types')
+async def revenue_by_furniture_type(date_from: Optional[datetime.date] = None,
+                                    date_to: Optional[datetime.date] = None,
+                                    session: AsyncSession = Depends(engine.get_read_session)):
+    facts = sales_facts(date_from, date_to)
+
+    query = (
+        select(Description.furniture_type.label("furniture_type"), *totals(facts))
+        .select_from(facts)
+        .join(Product, Product.id == facts.c.product_id)
+        .join(Description, Description.id == Product.description_id)
+        .group_by(Description.furniture_type)
+        .order_by(func.sum(facts.c.revenue).desc()))
+    return await fetch(session, query)
+
+
+@router.get('/buyers')
+async def revenue_by_buyer_organization(limit: int = Query(20, ge=1, le=500),
+                                        date_from: Optional[datetime.date] = None,
+                                        date_to: Optional[datetime.date] = None,
+                                        session: AsyncSession = Depends(engine.get_read_session)):
+    facts = sales_facts(date_from, date_to)
+
+    query = (
+        select(Buyer.organization_name.label("organization_name"), *totals(facts))
+        .select_from(facts)
+        .join(Buyer, Buyer.id == facts.c.buyer_id)
+        .group_by(Buyer.organization_name)
+        .order_by(func.sum(facts.c.revenue).desc())
+        .limit(limit))
+    return await fetch(session, query)
+
+
+@router.get('/top-products')
+async def top_products(limit: int = Query(10, ge=1, le=100), per_furniture_type: bool = False,
+                       date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                       session: AsyncSession = Depends(engine.get_read_session)):
+    facts = sales_facts(date_from, date_to)
+    revenue = func.sum(facts.c.revenue)
+    partition = [Description.furniture_type] if per_furniture_type else []
+
+    ranked = (
+        select(facts.c.product_id, Description.furniture_type.label("furniture_type"),
+               Description.material.label("material"), revenue.label("revenue"),
+               func.sum(facts.c.quantity).label("quantity"), func.sum(facts.c.sales).label("sales"),
+               func.rank().over(partition_by=partition, order_by=revenue.desc()).label("rank"))
+        .select_from(facts)
+        .join(Product, Product.id == facts.c.product_id)
+        .join(Description, Description.id == Product.description_id)
+        .group_by(facts.c.product_id, Description.furniture_type, Description.material)
+        .subquery("ranked"))
+
+    query = (
+        select(ranked)
+        .where(ranked.c.rank <= limit)
+        .order_by(*([ranked.c.furniture_type] if per_furniture_type else []), ranked.c.rank, ranked.c.product_id))
+    return await fetch(session, query)
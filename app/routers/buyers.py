@@ -1,30 +1,35 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import Query, Request
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.base import Buyer
 from app.models.db_engine import engine
-from app.schemas.base import BuyerResponse, BuyerRequest
+from app.schemas.base import BuyerResponse, BuyerRequest, SearchResult
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, update_returning
+from app.utils.etag import table_etag
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.search import search
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/buyers')
-async def get_buyers(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_buyers(request: Request, page: PageParams = Depends(page_params),
+                     session: AsyncSession = Depends(engine.get_read_session),
+                     cache_headers: dict = Depends(table_etag(Buyer))):
     try:
-        result = await session.execute(select(Buyer))
-        buyers = result.scalars().all()
+        buyers = await paginate(session, select(*model_columns(Buyer)), Buyer.id, page)
+
+        if wants_json(request):
+            return json_page(request, buyers, cache_headers)
 
-        return templates.TemplateResponse('buyers.html', {"request": request, "lst": buyers})
+        return templates.TemplateResponse('buyers.html', {"request": request, "lst": buyers.items, "page": buyers},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателей")
     except Exception as ex:
@@ -37,15 +42,20 @@ async def get_buyer_form(request: Request):
 
 
 @router.get('/buyers/{id}', response_model=BuyerResponse)
-async def get_buyer(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_buyer(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(Buyer).where(Buyer.id == id))
-        buyer = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(Buyer)).where(Buyer.id == id))
+        buyer = result.one_or_none()
 
         if buyer:
+            if wants_json(request):
+                return json_row(buyer)
+
             return templates.TemplateResponse('buyer_card.html', {"request": request, "buyer": buyer})
         else:
             raise HTTPException(status_code=404, detail="Покупатель не найден")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателя")
     except Exception as ex:
@@ -76,25 +86,16 @@ async def add_buyer(buyer: BuyerRequest, session: AsyncSession = Depends(engine.
 @router.put('/buyers/{id}')
 async def update_buyer(id: int, buyer_data: BuyerRequest, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Buyer).where(Buyer.id == id))
-        buyer = result.scalar_one_or_none()
+        row = await update_returning(session, Buyer, id, buyer_data.model_dump(exclude_none=True))
 
-        if buyer is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Покупатель не найден")
 
-        if buyer_data.full_name is not None:
-            buyer.full_name = buyer_data.full_name
-        if buyer_data.organization_name is not None:
-            buyer.organization_name = buyer_data.organization_name
-        if buyer_data.phone_number is not None:
-            buyer.phone_number = buyer_data.phone_number
-        if buyer_data.address is not None:
-            buyer.address = buyer_data.address
-
         await session.commit()
-        await session.refresh(buyer)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении покупателя")
     except Exception as ex:
@@ -104,16 +105,16 @@ async def update_buyer(id: int, buyer_data: BuyerRequest, session: AsyncSession
 @router.delete('/buyers/{id}')
 async def delete_buyer(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Buyer).where(Buyer.id == id))
-        buyer = result.scalar_one_or_none()
+        row = await delete_returning(session, Buyer, id)
 
-        if buyer is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Покупатель не найден")
 
-        await session.delete(buyer)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателя")
     except Exception as ex:
@@ -121,13 +122,31 @@ async def delete_buyer(id: int, session: AsyncSession = Depends(engine.get_sessi
 
 
 @router.get('/buyers-filtered')
-async def filter_buyers(request: Request, full_name: str, session: AsyncSession = Depends(engine.get_session)):
+async def filter_buyers(request: Request, full_name: str, page: PageParams = Depends(page_params),
+                        session: AsyncSession = Depends(engine.get_read_session),
+                        cache_headers: dict = Depends(table_etag(Buyer))):
     try:
-        buyers = await session.execute(select(Buyer).where(Buyer.full_name == full_name))
-        buyers = buyers.scalars().all()
+        query = select(*model_columns(Buyer)).where(Buyer.full_name == full_name)
+        buyers = await paginate(session, query, Buyer.id, page)
+
+        if wants_json(request):
+            return json_page(request, buyers, cache_headers)
 
-        return templates.TemplateResponse('buyers_filter.html', {"request": request, "lst": buyers})
+        return templates.TemplateResponse('buyers_filter.html',
+                                          {"request": request, "lst": buyers.items, "page": buyers},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателей")
     except Exception as ex:
         raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
+
+
+@router.get('/buyers-search', response_model=list[SearchResult])
+async def search_buyers(q: str = Query(min_length=2), limit: int = Query(settings.SEARCH_LIMIT, ge=1, le=50),
+                        session: AsyncSession = Depends(engine.get_read_session)):
+    try:
+        return await search(session, Buyer.id, Buyer.full_name, q, limit)
+    except SQLAlchemyError as error:
+        raise HTTPException(status_code=500, detail="Ошибка при поиске покупателей")
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
@@ -1,30 +1,35 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import Query, Request
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.base import Description
 from app.models.db_engine import engine
-from app.schemas.base import DescriptionResponse, DescriptionRequest
+from app.schemas.base import DescriptionResponse, DescriptionRequest, SearchResult
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, update_returning
+from app.utils.etag import table_etag
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.search import search
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/descriptions', response_model=list[DescriptionResponse])
-async def get_descriptions(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_descriptions(request: Request, page: PageParams = Depends(page_params),
+                           session: AsyncSession = Depends(engine.get_read_session),
+                           cache_headers: dict = Depends(table_etag(Description))):
     try:
-        result = await session.execute(select(Description))
-        descriptions = result.scalars().all()
+        descriptions = await paginate(session, select(*model_columns(Description)), Description.id, page)
+
+        if wants_json(request):
+            return json_page(request, descriptions, cache_headers)
 
-        return templates.TemplateResponse('descriptions.html', {"request": request, "lst": descriptions})
+        return templates.TemplateResponse('descriptions.html', {"request": request, "lst": descriptions.items, "page": descriptions},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении описаний")
     except Exception as ex:
@@ -37,15 +42,20 @@ async def get_description_form(request: Request):
 
 
 @router.get('/descriptions/{id}', response_model=DescriptionResponse)
-async def get_description(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_description(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(Description).where(Description.id == id))
-        description = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(Description)).where(Description.id == id))
+        description = result.one_or_none()
 
         if description:
+            if wants_json(request):
+                return json_row(description)
+
             return templates.TemplateResponse('description_card.html', {"request": request, "d": description})
         else:
             raise HTTPException(status_code=404, detail="Описание не найдено")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении описания")
     except Exception as ex:
@@ -77,25 +87,16 @@ async def add_description(description: DescriptionRequest, session: AsyncSession
 async def update_description(id: int, description_data: DescriptionRequest,
                              session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Description).where(Description.id == id))
-        description = result.scalar_one_or_none()
+        row = await update_returning(session, Description, id, description_data.model_dump(exclude_none=True))
 
-        if description is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Description not found")
 
-        if description_data.furniture_type is not None:
-            description.furniture_type = description_data.furniture_type
-        if description_data.material is not None:
-            description.material = description_data.material
-        if description_data.weight is not None:
-            description.weight = description_data.weight
-        if description_data.dimensions is not None:
-            description.dimensions = description_data.dimensions
-
         await session.commit()
-        await session.refresh(description)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении описания")
     except Exception as ex:
@@ -105,16 +106,16 @@ async def update_description(id: int, description_data: DescriptionRequest,
 @router.delete('/descriptions/{id}')
 async def delete_description(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Description).where(Description.id == id))
-        description = result.scalar_one_or_none()
+        row = await delete_returning(session, Description, id)
 
-        if description is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Description not found")
 
-        await session.delete(description)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении описания")
     except Exception as ex:
@@ -122,13 +123,31 @@ async def delete_description(id: int, session: AsyncSession = Depends(engine.get
 
 
 @router.get('/descriptions-filtered')
-async def filter_descriptions(request: Request, furniture_type: str, session: AsyncSession = Depends(engine.get_session)):
+async def filter_descriptions(request: Request, furniture_type: str, page: PageParams = Depends(page_params),
+                              session: AsyncSession = Depends(engine.get_read_session),
+                              cache_headers: dict = Depends(table_etag(Description))):
     try:
-        descriptions = await session.execute(select(Description).where(Description.furniture_type == furniture_type))
-        descriptions = descriptions.scalars().all()
+        query = select(*model_columns(Description)).where(Description.furniture_type == furniture_type)
+        descriptions = await paginate(session, query, Description.id, page)
+
+        if wants_json(request):
+            return json_page(request, descriptions, cache_headers)
 
-        return templates.TemplateResponse('descriptions_filter.html', {"request": request, "lst": descriptions})
+        return templates.TemplateResponse('descriptions_filter.html',
+                                          {"request": request, "lst": descriptions.items, "page": descriptions},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателей")
     except Exception as ex:
         raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
+
+
+@router.get('/descriptions-search', response_model=list[SearchResult])
+async def search_descriptions(q: str = Query(min_length=2), limit: int = Query(settings.SEARCH_LIMIT, ge=1, le=50),
+                              session: AsyncSession = Depends(engine.get_read_session)):
+    try:
+        return await search(session, Description.id, Description.furniture_type, q, limit)
+    except SQLAlchemyError as error:
+        raise HTTPException(status_code=500, detail="Ошибка при поиске описаний")
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
@@ -0,0 +1,77 @@
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator, Literal, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.config import settings
+from app.models.base import SalesRecord, StockRecord
+from app.models.db_engine import engine
+
+router = APIRouter(prefix='/exports')
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def ledger_query(model, columns: list, date_from: Optional[datetime.date],
+                 date_to: Optional[datetime.date]) -> Select:
+    query = select(*columns)
+
+    if date_from is not None:
+        query = query.where(model.date >= date_from)
+    if date_to is not None:
+        query = query.where(model.date <= date_to)
+
+    return query.order_by(model.id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+
+async def stream_rows(query: Select, fmt: str) -> AsyncIterator[str]:
+    # The request-scoped session is closed before the body is sent, so the export owns its session.
+    database = await engine.read_database()
+    async with database.session_factory() as session:
+        result = await session.stream(query)
+        keys = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(keys)
+            yield buffer.getvalue()
+
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+
+            if fmt == "csv":
+                csv.writer(buffer).writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(keys, row)), default=str, ensure_ascii=False))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+
+
+def export_response(query: Select, fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(stream_rows(query, fmt), media_type=MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'})
+
+
+@router.get('/sales')
+async def export_sales(fmt: Literal["csv", "ndjson"] = "csv", date_from: Optional[datetime.date] = None,
+                       date_to: Optional[datetime.date] = None):
+    query = ledger_query(SalesRecord, [SalesRecord.id, SalesRecord.date, SalesRecord.order_id, SalesRecord.buyer_id],
+                         date_from, date_to)
+
+    return export_response(query, fmt, "sales")
+
+
+@router.get('/stocks')
+async def export_stocks(fmt: Literal["csv", "ndjson"] = "csv", date_from: Optional[datetime.date] = None,
+                        date_to: Optional[datetime.date] = None):
+    query = ledger_query(StockRecord, [StockRecord.id, StockRecord.date, StockRecord.product_id, StockRecord.quantity],
+                         date_from, date_to)
+
+    return export_response(query, fmt, "stocks")
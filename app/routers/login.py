@@ -1,22 +1,16 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Request, status
 from fastapi.responses import HTMLResponse
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import RedirectResponse
 
 from app.config import settings
+from app.templating import templates
+from app.utils.negotiation import wants_json
+from app.utils.session import COOKIE, TTL_SECONDS, issue_token
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 
 def verify_user(username: str, password: str):
     if username == "admin" and password == settings.ADMIN_PASSWORD:
@@ -33,13 +27,22 @@ async def login(request: Request):
 
 
 @router.post("/token")
-async def token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     role = verify_user(form_data.username, form_data.password)
 
     if not role:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
+    access_token = issue_token(role)
+
+    if wants_json(request):
+        return {"access_token": access_token, "token_type": "bearer", "expires_in": TTL_SECONDS}
+
     if role == "admin":
-        return RedirectResponse(url="/admin", status_code=status.HTTP_303_SEE_OTHER)
+        response = RedirectResponse(url="/admin", status_code=status.HTTP_303_SEE_OTHER)
     else:
-        return RedirectResponse(url="/storekeeper", status_code=status.HTTP_303_SEE_OTHER)
+        response = RedirectResponse(url="/storekeeper", status_code=status.HTTP_303_SEE_OTHER)
+
+    response.set_cookie(COOKIE, access_token, max_age=TTL_SECONDS, httponly=True, samesite="lax",
+                        secure=settings.SESSION_COOKIE_SECURE)
+    return response
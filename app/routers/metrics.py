@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from app.middleware.admission import admission
+from app.models.db_engine import engine
+from app.utils.feed import feed
+
+router = APIRouter(prefix='/metrics')
+
+
+@router.get('/pool')
+async def get_pool_metrics():
+    return engine.pool_status()
+
+
+@router.get('/feed')
+async def get_feed_metrics():
+    return feed.status()
+
+
+@router.get('/admission')
+async def get_admission_metrics():
+    return admission.status()
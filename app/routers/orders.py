@@ -1,30 +1,36 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import Order
+from app.models.base import Order, SalesRecord
 from app.models.db_engine import engine
 from app.schemas.base import OrderResponse, OrderRequest
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, raise_update_error, update_returning
+from app.utils.etag import if_match_version, row_etag, table_etag
+from app.utils.idempotency import Idempotency, idempotency_key
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.rollup import removed_order_facts, rollup_sales, sale_facts
+from app.utils.stock import move_stock, move_stocks, stock_deltas
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/orders', response_model=list[OrderResponse])
-async def get_orders(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_orders(request: Request, page: PageParams = Depends(page_params),
+                     session: AsyncSession = Depends(engine.get_read_session),
+                     cache_headers: dict = Depends(table_etag(Order))):
     try:
-        result = await session.execute(select(Order))
-        orders = result.scalars().all()
+        orders = await paginate(session, select(*model_columns(Order)), Order.id, page)
+
+        if wants_json(request):
+            return json_page(request, orders, cache_headers)
 
-        return templates.TemplateResponse('orders.html', {"request": request, "lst": orders})
+        return templates.TemplateResponse('orders.html', {"request": request, "lst": orders.items, "page": orders},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении заказов")
     except Exception as ex:
@@ -37,15 +43,21 @@ async def get_order_form(request: Request):
 
 
 @router.get('/orders/{id}', response_model=OrderResponse)
-async def get_order(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_order(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(Order).where(Order.id == id))
-        order = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(Order)).where(Order.id == id))
+        order = result.one_or_none()
 
         if order:
-            return templates.TemplateResponse('order_card.html', {"request": request, "order": order})
+            if wants_json(request):
+                return json_row(order, row_etag(request, order.version))
+
+            return templates.TemplateResponse('order_card.html', {"request": request, "order": order},
+                                              headers=row_etag(request, order.version))
         else:
             raise HTTPException(status_code=404, detail="Заказ не найден")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении заказа")
     except Exception as ex:
@@ -53,8 +65,12 @@ async def get_order(request: Request, id: int, session: AsyncSession = Depends(e
 
 
 @router.post('/orders')
-async def add_order(order: OrderRequest, session: AsyncSession = Depends(engine.get_session)):
+async def add_order(order: OrderRequest, idempotency: Idempotency = Depends(idempotency_key),
+                    session: AsyncSession = Depends(engine.get_session)):
     try:
+        if order.product_quantity is None or order.total_cost is None or order.product_id is None:
+            raise HTTPException(status_code=422, detail="Не заполнены количество товаров, сумма или код товара")
+
         new_order = Order(
             product_quantity=order.product_quantity,
             total_cost=order.total_cost,
@@ -62,10 +78,14 @@ async def add_order(order: OrderRequest, session: AsyncSession = Depends(engine.
         )
 
         session.add(new_order)
+        await move_stock(session, order.product_id, -order.product_quantity)
+        await idempotency.save(session, '201')
         await session.commit()
         await session.refresh(new_order)
 
         return '201'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при добавлении заказа")
     except Exception as ex:
@@ -73,25 +93,26 @@ async def add_order(order: OrderRequest, session: AsyncSession = Depends(engine.
 
 
 @router.put('/orders/{id}')
-async def update_order(id: int, order_data: OrderRequest, session: AsyncSession = Depends(engine.get_session)):
+async def update_order(request: Request, id: int, order_data: OrderRequest,
+                       session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Order).where(Order.id == id))
-        order = result.scalar_one_or_none()
-
-        if order is None:
-            raise HTTPException(status_code=404, detail="Заказ не найден")
-
-        if order_data.product_quantity is not None:
-            order.product_quantity = order_data.product_quantity
-        if order_data.total_cost is not None:
-            order.total_cost = order_data.total_cost
-        if order_data.product_id is not None:
-            order.product_id = order_data.product_id
-
+        row = await update_returning(session, Order, id, order_data.model_dump(exclude_none=True),
+                                     previous=[Order.product_id, Order.product_quantity, Order.total_cost],
+                                     version=if_match_version(request))
+
+        if row is None:
+            await raise_update_error(session, Order, id, "Заказ не найден")
+
+        deltas = stock_deltas(row.old_product_id, -row.old_product_quantity, row.product_id, -row.product_quantity)
+        await move_stocks(session, deltas)
+        await rollup_sales(session,
+                           removed_order_facts(id, row.old_product_id, row.old_product_quantity, row.old_total_cost),
+                           sale_facts(1, SalesRecord.order_id == id))
         await session.commit()
-        await session.refresh(order)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении заказа")
     except Exception as ex:
@@ -101,16 +122,17 @@ async def update_order(id: int, order_data: OrderRequest, session: AsyncSession
 @router.delete('/orders/{id}')
 async def delete_order(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Order).where(Order.id == id))
-        order = result.scalar_one_or_none()
+        row = await delete_returning(session, Order, id)
 
-        if order is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Заказ не найден")
 
-        await session.delete(order)
+        await move_stock(session, row.product_id, row.product_quantity)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении заказа")
     except Exception as ex:
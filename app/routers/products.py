@@ -1,9 +1,5 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,20 +7,27 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.base import Product
 from app.models.db_engine import engine
 from app.schemas.base import ProductResponse, ProductRequest
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, raise_update_error, update_returning
+from app.utils.etag import if_match_version, row_etag, table_etag
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/products', response_model=list[ProductResponse])
-async def get_products(request: Request,  session: AsyncSession = Depends(engine.get_session)):
+async def get_products(request: Request, page: PageParams = Depends(page_params),
+                       session: AsyncSession = Depends(engine.get_read_session),
+                       cache_headers: dict = Depends(table_etag(Product))):
     try:
-        result = await session.execute(select(Product))
-        products = result.scalars().all()
+        products = await paginate(session, select(*model_columns(Product)), Product.id, page)
+
+        if wants_json(request):
+            return json_page(request, products, cache_headers)
 
-        return templates.TemplateResponse('products.html', {"request": request, "lst": products})
+        return templates.TemplateResponse('products.html', {"request": request, "lst": products.items, "page": products},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении товаров")
     except Exception as ex:
@@ -37,15 +40,21 @@ async def get_product_form(request: Request):
 
 
 @router.get('/products/{id}', response_model=ProductResponse)
-async def get_product(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_product(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(Product).where(Product.id == id))
-        product = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(Product)).where(Product.id == id))
+        product = result.one_or_none()
 
         if product:
-            return templates.TemplateResponse('product_card.html', {"request": request, "pr": product})
+            if wants_json(request):
+                return json_row(product, row_etag(request, product.version))
+
+            return templates.TemplateResponse('product_card.html', {"request": request, "pr": product},
+                                              headers=row_etag(request, product.version))
         else:
             raise HTTPException(status_code=404, detail="Товар не найден")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении товара")
     except Exception as ex:
@@ -74,28 +83,20 @@ async def add_product(product: ProductRequest, session: AsyncSession = Depends(e
 
 
 @router.put('/products/{id}')
-async def update_product(id: int, product_data: ProductRequest,
+async def update_product(request: Request, id: int, product_data: ProductRequest,
                          session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Product).where(Product.id == id))
-        product = result.scalar_one_or_none()
-
-        if product is None:
-            raise HTTPException(status_code=404, detail="Товар не найден")
+        row = await update_returning(session, Product, id, product_data.model_dump(exclude_none=True),
+                                     version=if_match_version(request))
 
-        if product_data.price is not None:
-            product.price = product_data.price
-        if product_data.stock is not None:
-            product.stock = product_data.stock
-        if product_data.provider_id is not None:
-            product.provider_id = product_data.provider_id
-        if product_data.description_id is not None:
-            product.description_id = product_data.description_id
+        if row is None:
+            await raise_update_error(session, Product, id, "Товар не найден")
 
         await session.commit()
-        await session.refresh(product)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении товара")
     except Exception as ex:
@@ -105,16 +106,16 @@ async def update_product(id: int, product_data: ProductRequest,
 @router.delete('/products/{id}')
 async def delete_product(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Product).where(Product.id == id))
-        product = result.scalar_one_or_none()
+        row = await delete_returning(session, Product, id)
 
-        if product is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Товар не найден")
 
-        await session.delete(product)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении товара")
     except Exception as ex:
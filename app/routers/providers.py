@@ -1,30 +1,35 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import Query, Request
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.base import Provider
 from app.models.db_engine import engine
-from app.schemas.base import ProviderResponse, ProviderRequest
+from app.schemas.base import ProviderResponse, ProviderRequest, SearchResult
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, update_returning
+from app.utils.etag import table_etag
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.search import search
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/providers', response_model=list[ProviderResponse])
-async def get_providers(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_providers(request: Request, page: PageParams = Depends(page_params),
+                        session: AsyncSession = Depends(engine.get_read_session),
+                        cache_headers: dict = Depends(table_etag(Provider))):
     try:
-        result = await session.execute(select(Provider))
-        providers = result.scalars().all()
+        providers = await paginate(session, select(*model_columns(Provider)), Provider.id, page)
+
+        if wants_json(request):
+            return json_page(request, providers, cache_headers)
 
-        return templates.TemplateResponse('providers.html', {"request": request, "lst": providers})
+        return templates.TemplateResponse('providers.html', {"request": request, "lst": providers.items, "page": providers},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении постващиков")
     except Exception as ex:
@@ -37,15 +42,20 @@ async def get_provider_form(request: Request):
 
 
 @router.get('/providers/{id}', response_model=ProviderResponse)
-async def get_provider(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_provider(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(Provider).where(Provider.id == id))
-        provider = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(Provider)).where(Provider.id == id))
+        provider = result.one_or_none()
 
         if provider:
+            if wants_json(request):
+                return json_row(provider)
+
             return templates.TemplateResponse('provider_card.html', {"request": request, "pr": provider})
         else:
             raise HTTPException(status_code=404, detail="Поставщик не найден")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении поставщика")
     except Exception as ex:
@@ -76,23 +86,16 @@ async def add_provider(provider: ProviderRequest, session: AsyncSession = Depend
 async def update_provider(id: int, provider_data: ProviderRequest,
                           session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Provider).where(Provider.id == id))
-        provider = result.scalar_one_or_none()
+        row = await update_returning(session, Provider, id, provider_data.model_dump(exclude_none=True))
 
-        if provider is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Поставщик не найден")
 
-        if provider_data.organization_name is not None:
-            provider.organization_name = provider_data.organization_name
-        if provider_data.phone_number is not None:
-            provider.phone_number = provider_data.phone_number
-        if provider_data.email is not None:
-            provider.email = provider_data.email
-
         await session.commit()
-        await session.refresh(provider)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении поставщика")
     except Exception as ex:
@@ -102,16 +105,16 @@ async def update_provider(id: int, provider_data: ProviderRequest,
 @router.delete('/providers/{id}')
 async def delete_provider(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Provider).where(Provider.id == id))
-        provider = result.scalar_one_or_none()
+        row = await delete_returning(session, Provider, id)
 
-        if provider is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Поставщик не найден")
 
-        await session.delete(provider)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении поставщика")
     except Exception as ex:
@@ -119,14 +122,31 @@ async def delete_provider(id: int, session: AsyncSession = Depends(engine.get_se
 
 
 @router.get('/providers-filtered')
-async def filter_providers(request: Request, organization_name: str,
-                           session: AsyncSession = Depends(engine.get_session)):
+async def filter_providers(request: Request, organization_name: str, page: PageParams = Depends(page_params),
+                           session: AsyncSession = Depends(engine.get_read_session),
+                           cache_headers: dict = Depends(table_etag(Provider))):
     try:
-        providers = await session.execute(select(Provider).where(Provider.organization_name == organization_name))
-        providers = providers.scalars().all()
+        query = select(*model_columns(Provider)).where(Provider.organization_name == organization_name)
+        providers = await paginate(session, query, Provider.id, page)
+
+        if wants_json(request):
+            return json_page(request, providers, cache_headers)
 
-        return templates.TemplateResponse('providers_filter.html', {"request": request, "lst": providers})
+        return templates.TemplateResponse('providers_filter.html',
+                                          {"request": request, "lst": providers.items, "page": providers},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении покупателей")
     except Exception as ex:
         raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
+
+
+@router.get('/providers-search', response_model=list[SearchResult])
+async def search_providers(q: str = Query(min_length=2), limit: int = Query(settings.SEARCH_LIMIT, ge=1, le=50),
+                           session: AsyncSession = Depends(engine.get_read_session)):
+    try:
+        return await search(session, Provider.id, Provider.organization_name, q, limit)
+    except SQLAlchemyError as error:
+        raise HTTPException(status_code=500, detail="Ошибка при поиске поставщиков")
+    except Exception as ex:
+        raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
@@ -1,9 +1,5 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,20 +7,29 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.base import SalesRecord
 from app.models.db_engine import engine
 from app.schemas.base import SalesRecordRequest, SalesRecordResponse
+from app.templating import templates
+from app.utils.crud import delete_returning, model_columns, update_returning
+from app.utils.etag import table_etag
+from app.utils.idempotency import Idempotency, idempotency_key
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.rollup import lock_orders, removed_sale_facts, rollup_sales, sale_facts
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/sales-accounting', response_model=list[SalesRecordResponse])
-async def get_all_sales_accounting(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_all_sales_accounting(request: Request, page: PageParams = Depends(page_params),
+                                   session: AsyncSession = Depends(engine.get_read_session),
+                                   cache_headers: dict = Depends(table_etag(SalesRecord))):
     try:
-        result = await session.execute(select(SalesRecord))
-        sales = result.scalars().all()
+        sales = await paginate(session, select(*model_columns(SalesRecord)), SalesRecord.id, page)
+
+        if wants_json(request):
+            return json_page(request, sales, cache_headers)
 
-        return templates.TemplateResponse('sales.html', {"request": request, "lst": sales})
+        return templates.TemplateResponse('sales.html', {"request": request, "lst": sales.items, "page": sales},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении продаж")
     except Exception as ex:
@@ -37,15 +42,20 @@ async def get_sale_form(request: Request):
 
 
 @router.get('/sales-accounting/{id}', response_model=SalesRecordResponse)
-async def get_sale(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_sale(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(SalesRecord).where(SalesRecord.id == id))
-        sale = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(SalesRecord)).where(SalesRecord.id == id))
+        sale = result.one_or_none()
 
         if sale:
+            if wants_json(request):
+                return json_row(sale)
+
             return templates.TemplateResponse('sale_card.html', {"request": request, "sale": sale})
         else:
             raise HTTPException(status_code=404, detail="Продажа не найдена")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении продажи")
     except Exception as ex:
@@ -53,7 +63,8 @@ async def get_sale(request: Request, id: int, session: AsyncSession = Depends(en
 
 
 @router.post('/sales-accounting')
-async def add_sales_accounting(sale_data: SalesRecordRequest, session: AsyncSession = Depends(engine.get_session)):
+async def add_sales_accounting(sale_data: SalesRecordRequest, idempotency: Idempotency = Depends(idempotency_key),
+                               session: AsyncSession = Depends(engine.get_session)):
     try:
         new_sales = SalesRecord(
             date=sale_data.date,
@@ -62,10 +73,16 @@ async def add_sales_accounting(sale_data: SalesRecordRequest, session: AsyncSess
         )
 
         session.add(new_sales)
+        await session.flush()
+        await lock_orders(session, new_sales.order_id)
+        await rollup_sales(session, sale_facts(1, SalesRecord.id == new_sales.id))
+        await idempotency.save(session, '201')
         await session.commit()
         await session.refresh(new_sales)
 
         return '201'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при добавлении продажи")
     except Exception as ex:
@@ -76,23 +93,20 @@ async def add_sales_accounting(sale_data: SalesRecordRequest, session: AsyncSess
 async def update_sales_accounting(id: int, sale_data: SalesRecordRequest,
                                   session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(SalesRecord).where(SalesRecord.id == id))
-        sale = result.scalar_one_or_none()
+        row = await update_returning(session, SalesRecord, id, sale_data.model_dump(exclude_none=True),
+                                     previous=[SalesRecord.date, SalesRecord.order_id, SalesRecord.buyer_id])
 
-        if sale is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Продажа не найдена")
 
-        if sale_data.date is not None:
-            sale.date = sale_data.date
-        if sale_data.order_id is not None:
-            sale.order_id = sale_data.order_id
-        if sale_data.buyer_id is not None:
-            sale.buyer_id = sale_data.buyer_id
-
+        await lock_orders(session, row.old_order_id, row.order_id)
+        await rollup_sales(session, removed_sale_facts(row.old_date, row.old_order_id, row.old_buyer_id),
+                           sale_facts(1, SalesRecord.id == id))
         await session.commit()
-        await session.refresh(sale)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обвнолении продажи")
     except Exception as ex:
@@ -102,16 +116,18 @@ async def update_sales_accounting(id: int, sale_data: SalesRecordRequest,
 @router.delete('/sales-accounting/{id}')
 async def delete_sales_accounting(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(SalesRecord).where(SalesRecord.id == id))
-        sales_accounting = result.scalar_one_or_none()
+        row = await delete_returning(session, SalesRecord, id)
 
-        if sales_accounting is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Продажа не найдена")
 
-        await session.delete(sales_accounting)
+        await lock_orders(session, row.order_id)
+        await rollup_sales(session, removed_sale_facts(row.date, row.order_id, row.buyer_id))
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении продажи")
     except Exception as ex:
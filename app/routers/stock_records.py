@@ -1,30 +1,44 @@
-from pathlib import Path
+import csv
+import io
+import itertools
+from typing import Optional
 
+import asyncpg
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import Request, UploadFile
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import StockRecord
+from app.config import settings
+from app.models.base import Product, StockRecord
 from app.models.db_engine import engine
 from app.schemas.base import StockRecordRequest, StockRecordResponse
+from app.templating import templates
+from app.utils.bulk import INT4_MAX, copy_records, is_invalid_data
+from app.utils.crud import delete_returning, existing_ids, model_columns, update_returning
+from app.utils.etag import table_etag
+from app.utils.idempotency import Idempotency, idempotency_key
+from app.utils.negotiation import json_page, json_row, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.stock import move_stock, move_stocks, stock_deltas
 
 router = APIRouter()
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
-
 
 @router.get('/stocks-accounting', response_model=list[StockRecordResponse])
-async def get_all_stocks_accounting(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_all_stocks_accounting(request: Request, page: PageParams = Depends(page_params),
+                                    session: AsyncSession = Depends(engine.get_read_session),
+                                    cache_headers: dict = Depends(table_etag(StockRecord))):
     try:
-        result = await session.execute(select(StockRecord))
-        stocks = result.scalars().all()
+        stocks = await paginate(session, select(*model_columns(StockRecord)), StockRecord.id, page)
+
+        if wants_json(request):
+            return json_page(request, stocks, cache_headers)
 
-        return templates.TemplateResponse('stocks.html', {"request": request, "lst": stocks})
+        return templates.TemplateResponse('stocks.html', {"request": request, "lst": stocks.items, "page": stocks},
+                                          headers=cache_headers)
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении поступления")
     except Exception as ex:
@@ -37,15 +51,20 @@ async def get_stock_form(request: Request):
 
 
 @router.get('/stock-accounting/{id}', response_model=StockRecordResponse)
-async def get_stock(request: Request, id: int, session: AsyncSession = Depends(engine.get_session)):
+async def get_stock(request: Request, id: int, session: AsyncSession = Depends(engine.get_read_session)):
     try:
-        result = await session.execute(select(StockRecord).where(StockRecord.id == id))
-        stock = result.scalar_one_or_none()
+        result = await session.execute(select(*model_columns(StockRecord)).where(StockRecord.id == id))
+        stock = result.one_or_none()
 
         if stock:
+            if wants_json(request):
+                return json_row(stock)
+
             return templates.TemplateResponse('stock_card.html', {"request": request, "stock": stock})
         else:
             raise HTTPException(status_code=404, detail="Поступление не найдена")
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при получении поступления")
     except Exception as ex:
@@ -53,8 +72,12 @@ async def get_stock(request: Request, id: int, session: AsyncSession = Depends(e
 
 
 @router.post('/stocks-accounting')
-async def add_stocks_accounting(stock_data: StockRecordRequest, session: AsyncSession = Depends(engine.get_session)):
+async def add_stocks_accounting(stock_data: StockRecordRequest, idempotency: Idempotency = Depends(idempotency_key),
+                                session: AsyncSession = Depends(engine.get_session)):
     try:
+        if stock_data.date is None or stock_data.product_id is None or stock_data.quantity is None:
+            raise HTTPException(status_code=422, detail="Не заполнены дата, код товара или количество")
+
         new_stock = StockRecord(
             date=stock_data.date,
             product_id=stock_data.product_id,
@@ -62,10 +85,14 @@ async def add_stocks_accounting(stock_data: StockRecordRequest, session: AsyncSe
         )
 
         session.add(new_stock)
+        await move_stock(session, stock_data.product_id, stock_data.quantity)
+        await idempotency.save(session, '201')
         await session.commit()
         await session.refresh(new_stock)
 
         return '201'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при добавлении поступлаения")
     except Exception as ex:
@@ -76,23 +103,18 @@ async def add_stocks_accounting(stock_data: StockRecordRequest, session: AsyncSe
 async def update_stocks_accounting(id: int, stock_data: StockRecordRequest,
                                    session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(StockRecord).where(StockRecord.id == id))
-        stock = result.scalar_one_or_none()
+        row = await update_returning(session, StockRecord, id, stock_data.model_dump(exclude_none=True),
+                                     previous=[StockRecord.product_id, StockRecord.quantity])
 
-        if stock is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Поступление не найдено")
 
-        if stock_data.date is not None:
-            stock.date = stock_data.date
-        if stock_data.product_id is not None:
-            stock.product_id = stock_data.product_id
-        if stock_data.quantity is not None:
-            stock.quantity = stock_data.quantity
-
+        await move_stocks(session, stock_deltas(row.old_product_id, row.old_quantity, row.product_id, row.quantity))
         await session.commit()
-        await session.refresh(stock)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обвнолении продажи")
     except Exception as ex:
@@ -102,17 +124,104 @@ async def update_stocks_accounting(id: int, stock_data: StockRecordRequest,
 @router.delete('/stocks-accounting/{id}')
 async def delete_stock_accounting(id: int, session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(StockRecord).where(StockRecord.id == id))
-        stock_accounting = result.scalar_one_or_none()
+        row = await delete_returning(session, StockRecord, id)
 
-        if stock_accounting is None:
+        if row is None:
             raise HTTPException(status_code=404, detail="Поступление не найдено")
 
-        await session.delete(stock_accounting)
+        await move_stock(session, row.product_id, -row.quantity)
         await session.commit()
 
         return '204'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при удалении поступления")
     except Exception as ex:
         raise HTTPException(status_code=500, detail="Ошибка при обработке запроса, попробуйте позже")
+
+
+async def validate_stock_records(stocks: list[Optional[StockRecordRequest]], session: AsyncSession,
+                                 errors: list[dict]):
+    records = []
+    for row, stock in enumerate(stocks):
+        if stock is None:
+            continue
+        elif stock.date is None or stock.product_id is None or stock.quantity is None:
+            errors.append({"row": row, "detail": "Не заполнены дата, код товара или количество"})
+        elif stock.quantity > INT4_MAX:
+            errors.append({"row": row, "detail": "Количество слишком велико"})
+        elif not 0 < stock.product_id <= INT4_MAX:
+            errors.append({"row": row, "detail": f"Товар {stock.product_id} не найден"})
+        else:
+            records.append((row, (stock.date.date(), stock.product_id, stock.quantity)))
+
+    product_ids = {record[1] for _, record in records}
+    missing = product_ids - set(await existing_ids(session, Product, product_ids))
+
+    for row, record in records:
+        if record[1] in missing:
+            errors.append({"row": row, "detail": f"Товар {record[1]} не найден"})
+
+    return [record for _, record in records if record[1] not in missing]
+
+
+async def add_stocks_bulk(stocks: list[Optional[StockRecordRequest]], session: AsyncSession, errors: list[dict]):
+    if len(stocks) > settings.STOCK_BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Не более {settings.STOCK_BULK_MAX_ROWS} строк за запрос")
+
+    records = await validate_stock_records(stocks, session, errors)
+
+    if errors:
+        raise HTTPException(status_code=422, detail=sorted(errors, key=lambda error: error["row"]))
+
+    deltas = {}
+    for _, product_id, quantity in records:
+        deltas[product_id] = deltas.get(product_id, 0) + quantity
+
+    overflow = sorted(product_id for product_id, delta in deltas.items() if delta > INT4_MAX)
+    if overflow:
+        raise HTTPException(status_code=422, detail=f"Суммарное количество слишком велико для товаров {overflow}")
+
+    try:
+        await copy_records(session, StockRecord, ["date", "product_id", "quantity"], records)
+        await move_stocks(session, deltas)
+        await session.commit()
+
+        return {"inserted": len(records)}
+    except HTTPException:
+        raise
+    # COPY goes through the asyncpg connection directly, so its errors arrive unwrapped by SQLAlchemy.
+    except (SQLAlchemyError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+        await session.rollback()
+        if is_invalid_data(error):
+            raise HTTPException(status_code=422, detail="Поступления не соответствуют данным в базе")
+        raise HTTPException(status_code=500, detail="Ошибка при добавлении поступлений")
+
+
+@router.post('/stocks-accounting/bulk')
+async def add_stocks_accounting_bulk(stocks: list[StockRecordRequest],
+                                     session: AsyncSession = Depends(engine.get_session)):
+    return await add_stocks_bulk(stocks, session, [])
+
+
+@router.post('/stocks-accounting/bulk-csv')
+async def add_stocks_accounting_csv(file: UploadFile, session: AsyncSession = Depends(engine.get_session)):
+    try:
+        reader = csv.DictReader(io.StringIO((await file.read()).decode("utf-8-sig")))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Файл должен быть в кодировке UTF-8")
+
+    stocks, errors = [], []
+    try:
+        # One row past the limit is enough for add_stocks_bulk to reject the file without reading all of it.
+        for row, line in enumerate(itertools.islice(reader, settings.STOCK_BULK_MAX_ROWS + 1)):
+            try:
+                stocks.append(StockRecordRequest.model_validate({key: value or None for key, value in line.items()}))
+            except ValidationError as error:
+                errors.append({"row": row, "detail": error.errors(include_url=False, include_context=False)})
+                stocks.append(None)
+    except csv.Error:
+        raise HTTPException(status_code=400, detail="Некорректный CSV-файл")
+
+    return await add_stocks_bulk(stocks, session, errors)
@@ -1,22 +1,25 @@
-from pathlib import Path
-
 from fastapi import APIRouter, HTTPException
 from fastapi import Depends
 from fastapi import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.base import Product, Description, Buyer, Provider, Order, SalesRecord, StockRecord
 from app.models.db_engine import engine
-from app.schemas.base import ProductInfo, SaleInfo, StockInfo, ProductData
-
-router = APIRouter(prefix='/storekeeper')
+from app.schemas.base import ProductData
+from app.templating import templates
+from app.utils.crud import existing_ids, model_columns, raise_update_error
+from app.utils.etag import if_match_version, table_etag
+from app.utils.feed import feed
+from app.utils.negotiation import json_page, wants_json
+from app.utils.pagination import PageParams, page_params, paginate
+from app.utils.session import require_role
+from app.utils.stock import set_stocks
 
-router.mount("/static", StaticFiles(directory=Path(__file__).resolve().parent.parent / "static"), name="static")
-templates = Jinja2Templates(directory=Path(__file__).resolve().parent.parent / "templates")
+router = APIRouter(prefix='/storekeeper', dependencies=[Depends(require_role("storekeeper", "admin"))])
 
 
 @router.get('/')
@@ -24,74 +27,109 @@ async def storekeeper(request: Request):
     return templates.TemplateResponse("storekeeper.html", {"request": request})
 
 
+@router.get('/events')
+async def stock_events():
+    return StreamingResponse(feed.stream(settings.FEED_KEEPALIVE_SECONDS), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.get('/products-info')
-async def get_products_info(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_products_info(request: Request, page: PageParams = Depends(page_params),
+                            session: AsyncSession = Depends(engine.get_read_session),
+                            cache_headers: dict = Depends(table_etag(Product, Description))):
     query = (
         select(Product.price, Product.stock, Description.dimensions, Description.weight, Description.furniture_type,
-               Description.material, Product.id, Product.stock)
+               Description.material, Product.id, Product.version)
         .join(Description, Product.description_id == Description.id))
 
-    result = await session.execute(query)
-    result = [ProductInfo.from_orm(_).dict() for _ in result.fetchall()]
+    result = await paginate(session, query, Product.id, page)
+
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
 
-    return templates.TemplateResponse("products_table.html", {"request": request, "lst": result})
+    return templates.TemplateResponse("products_table.html", {"request": request, "lst": result.items, "page": result},
+                                      headers=cache_headers)
 
 
 @router.get('/products-info-filtered')
-async def filter_products_info(request: Request, furniture_type: str,
-                               session: AsyncSession = Depends(engine.get_session)):
+async def filter_products_info(request: Request, furniture_type: str, page: PageParams = Depends(page_params),
+                               session: AsyncSession = Depends(engine.get_read_session),
+                               cache_headers: dict = Depends(table_etag(Product, Description))):
     query = (
         select(Product.price, Product.stock, Description.dimensions, Description.weight, Description.furniture_type,
-               Description.material, Product.id)
+               Description.material, Product.id, Product.version)
         .join(Description, Product.description_id == Description.id)
         .where(Description.furniture_type == furniture_type))
 
-    result = await session.execute(query)
-    result = [ProductInfo.from_orm(_).dict() for _ in result.fetchall()]
+    result = await paginate(session, query, Product.id, page)
 
-    return templates.TemplateResponse("products_table_filter.html", {"request": request, "lst": result})
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
+
+    return templates.TemplateResponse("products_table_filter.html",
+                                      {"request": request, "lst": result.items, "page": result}, headers=cache_headers)
 
 
 @router.get('/sales-info')
-async def get_sales_info(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_sales_info(request: Request, page: PageParams = Depends(page_params),
+                         session: AsyncSession = Depends(engine.get_read_session),
+                         cache_headers: dict = Depends(table_etag(SalesRecord, Order, Buyer))):
     query = (
-        select(SalesRecord.date, Order.total_cost, Order.product_quantity, Buyer.address, Buyer.phone_number,
-               )
+        select(SalesRecord.id, SalesRecord.date, Order.total_cost, Order.product_quantity, Buyer.address,
+               Buyer.phone_number)
     ).join(SalesRecord, Order.id == SalesRecord.order_id).join(Buyer, Buyer.id == SalesRecord.buyer_id)
 
-    result = await session.execute(query)
-    result = [SaleInfo.from_orm(_).dict() for _ in result.fetchall()]
+    result = await paginate(session, query, SalesRecord.id, page)
+
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
 
-    return templates.TemplateResponse("sales_table.html", {"request": request, "lst": result})
+    return templates.TemplateResponse("sales_table.html", {"request": request, "lst": result.items, "page": result},
+                                      headers=cache_headers)
 
 
 @router.get('/stocks-info')
-async def get_stocks_info(request: Request, session: AsyncSession = Depends(engine.get_session)):
+async def get_stocks_info(request: Request, page: PageParams = Depends(page_params),
+                          session: AsyncSession = Depends(engine.get_read_session),
+                          cache_headers: dict = Depends(table_etag(StockRecord, Product, Provider))):
     query = (
-        select(Provider.organization_name, StockRecord.product_id,
+        select(StockRecord.id, Provider.organization_name, StockRecord.product_id,
                StockRecord.date, StockRecord.quantity)
     ).join(Product, StockRecord.product_id == Product.id).join(Provider, Provider.id == Product.provider_id)
 
-    result = await session.execute(query)
-    result = [StockInfo.from_orm(_).dict() for _ in result.fetchall()]
+    result = await paginate(session, query, StockRecord.id, page)
+
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
 
-    return templates.TemplateResponse("stocks_table.html", {"request": request, "lst": result})
+    return templates.TemplateResponse("stocks_table.html", {"request": request, "lst": result.items, "page": result},
+                                      headers=cache_headers)
 
 
 @router.get('/orders-info')
-async def get_orders_info(request: Request, session: AsyncSession = Depends(engine.get_session)):
-    result = await session.execute(select(Order))
-    result = result.scalars().all()
+async def get_orders_info(request: Request, page: PageParams = Depends(page_params),
+                          session: AsyncSession = Depends(engine.get_read_session),
+                          cache_headers: dict = Depends(table_etag(Order))):
+    result = await paginate(session, select(*model_columns(Order)), Order.id, page)
 
-    return templates.TemplateResponse("orders_table.html", {"request": request, "lst": result})
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
+
+    return templates.TemplateResponse("orders_table.html", {"request": request, "lst": result.items, "page": result},
+                                      headers=cache_headers)
 
 
 @router.get('/providers-info')
-async def get_providers_info(request: Request, session: AsyncSession = Depends(engine.get_session)):
-    result = await session.execute(select(Provider))
-    result = result.scalars().all()
+async def get_providers_info(request: Request, page: PageParams = Depends(page_params),
+                             session: AsyncSession = Depends(engine.get_read_session),
+                             cache_headers: dict = Depends(table_etag(Provider))):
+    result = await paginate(session, select(*model_columns(Provider)), Provider.id, page)
+
+    if wants_json(request):
+        return json_page(request, result, cache_headers)
 
-    return templates.TemplateResponse("providers_table.html", {"request": request, "lst": result})
+    return templates.TemplateResponse("providers_table.html", {"request": request, "lst": result.items, "page": result},
+                                      headers=cache_headers)
 
 
 @router.get('/order-form')
@@ -120,21 +158,27 @@ async def get_edit_form(request: Request):
 
 
 @router.patch('/products')
-async def update_product_info(product_data: ProductData, session: AsyncSession = Depends(engine.get_session)):
+async def update_product_info(request: Request, product_data: ProductData | list[ProductData],
+                              session: AsyncSession = Depends(engine.get_session)):
     try:
-        result = await session.execute(select(Product).where(Product.id == product_data.id))
-        product = result.scalar_one_or_none()
+        if isinstance(product_data, list):
+            versions = {item.id: item.version for item in product_data if item.version is not None}
+            rejected = await set_stocks(session, {item.id: item.count for item in product_data}, versions)
+            conflicts = await existing_ids(session, Product, rejected) if rejected and versions else []
+            await session.commit()
 
-        if product is None:
-            raise HTTPException(status_code=404, detail="Товар не найден")
+            return {"updated": len({item.id for item in product_data}) - len(rejected),
+                    "missing": sorted(set(rejected) - set(conflicts)), "conflicts": conflicts}
 
-        if product_data.count is not None:
-            product.stock = product_data.count
+        version = product_data.version if product_data.version is not None else if_match_version(request)
+        if await set_stocks(session, {product_data.id: product_data.count}, {product_data.id: version}):
+            await raise_update_error(session, Product, product_data.id, "Товар не найден")
 
         await session.commit()
-        await session.refresh(product)
 
         return '200'
+    except HTTPException:
+        raise
     except SQLAlchemyError as error:
         raise HTTPException(status_code=500, detail="Ошибка при обновлении товара")
     except Exception as ex:
@@ -1,6 +1,6 @@
 import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class OrderResponse(BaseModel):
@@ -8,13 +8,14 @@ class OrderResponse(BaseModel):
     product_quantity: int
     total_cost: float
     product_id: int
+    version: int
 
     class Config:
         from_attributes = True
 
 
 class OrderRequest(BaseModel):
-    product_quantity: int = None
+    product_quantity: int = Field(default=None, gt=0)
     total_cost: float = None
     product_id: int = None
 
@@ -77,6 +78,7 @@ class ProductResponse(BaseModel):
     stock: int
     provider_id: int
     description_id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -118,7 +120,7 @@ class StockRecordResponse(BaseModel):
 class StockRecordRequest(BaseModel):
     date: datetime.datetime = None
     product_id: int = None
-    quantity: int = None
+    quantity: int = Field(default=None, gt=0)
 
 
 class ProductInfo(BaseModel):
@@ -179,4 +181,14 @@ class OrderInfo(BaseModel):
 
 class ProductData(BaseModel):
     id: int
-    count: int
+    count: int = Field(ge=0)
+    version: int = None
+
+
+class SearchResult(BaseModel):
+    id: int
+    value: str
+    score: float
+
+    class Config:
+        from_attributes = True
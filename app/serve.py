@@ -0,0 +1,43 @@
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("app")
+
+
+def available_cores() -> int:
+    # The affinity mask honours taskset and container CPU pinning, cpu_count() does not.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the application with one worker process per core")
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS or available_cores())
+    args = parser.parse_args()
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.info(f"Starting {args.workers} workers on {args.host}:{args.port} with {loop} and {http}, up to "
+                f"{args.workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)} database connections")
+
+    # Every worker finishes the lifespan warmup before it accepts from the shared socket; until then the
+    # kernel queues connections in the backlog. SIGTERM stops accepting and lets requests in flight finish
+    # for up to WEB_GRACEFUL_TIMEOUT seconds before the lifespan shutdown disposes of the pools.
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, loop=loop, http=http,
+                lifespan="on", backlog=settings.WEB_BACKLOG, timeout_keep_alive=settings.WEB_KEEPALIVE_SECONDS,
+                timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT, proxy_headers=True)
+
+
+if __name__ == "__main__":
+    main()
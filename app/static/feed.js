@@ -0,0 +1,64 @@
+function showStaleNotice() {
+    if (document.getElementById('feedNotice')) {
+        return;
+    }
+
+    const notice = document.createElement('div');
+    notice.id = 'feedNotice';
+    notice.className = 'feed-notice';
+    notice.textContent = 'Данные изменились. Нажмите, чтобы обновить страницу.';
+    notice.onclick = () => window.location.reload();
+    document.body.prepend(notice);
+}
+
+function applyChange(table, change) {
+    const row = table.querySelector(`tr[data-id="${change.row['код']}"]`);
+
+    if (!row) {
+        if (change.op === 'INSERT') {
+            showStaleNotice();
+        }
+        return;
+    }
+
+    if (change.op === 'DELETE') {
+        row.remove();
+        return;
+    }
+
+    row.querySelectorAll('td[data-column]').forEach((cell) => {
+        const value = change.row[cell.dataset.column];
+        if (value !== undefined && String(value) !== cell.textContent) {
+            cell.textContent = value;
+            cell.classList.add('changed');
+        }
+    });
+}
+
+function subscribeToStockChanges() {
+    const table = document.querySelector('table[data-feed]');
+    if (!table || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/storekeeper/events');
+    let interrupted = false;
+
+    source.addEventListener('change', (event) => {
+        const change = JSON.parse(event.data);
+        if (change.table === table.dataset.feed) {
+            applyChange(table, change);
+        }
+    });
+    source.addEventListener('reset', showStaleNotice);
+    source.onerror = () => {
+        interrupted = true;
+    };
+    source.onopen = () => {
+        if (interrupted) {
+            showStaleNotice();
+        }
+    };
+}
+
+document.addEventListener('DOMContentLoaded', subscribeToStockChanges);
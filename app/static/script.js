@@ -424,7 +424,8 @@ async function submitFormProduct() {
     }
 }
 async function updateProduct(productId) {
-    const formData = new FormData(document.getElementById('updateProductForm'));
+    const form = document.getElementById('updateProductForm');
+    const formData = new FormData(form);
     const productData = {};
 
     for (const [key, value] of formData.entries()) {
@@ -435,7 +436,8 @@ async function updateProduct(productId) {
         const response = await fetch(`/products/${productId}`, {
             method: 'PUT',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'If-Match': `"v${form.dataset.version}"`
             },
             body: JSON.stringify(productData),
         });
@@ -457,6 +459,7 @@ async function updateProduct(productId) {
             return;
         }
 
+        form.dataset.version = Number(form.dataset.version) + 1;
         alert('Данные товара успешно обновлены!');
     } catch (error) {
         console.error('Ошибка обновления данных товара:', error);
@@ -529,7 +532,8 @@ async function deleteOrder(orderId) {
       }
 }
 async function updateOrder(orderId) {
-    const formData = new FormData(document.getElementById('updateOrderForm'));
+    const form = document.getElementById('updateOrderForm');
+    const formData = new FormData(form);
     const orderData = {};
 
     for (const [key, value] of formData.entries()) {
@@ -540,7 +544,8 @@ async function updateOrder(orderId) {
         const response = await fetch(`/orders/${orderId}`, {
             method: 'PUT',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'If-Match': `"v${form.dataset.version}"`
             },
             body: JSON.stringify(orderData),
         });
@@ -562,6 +567,7 @@ async function updateOrder(orderId) {
             return;
         }
 
+        form.dataset.version = Number(form.dataset.version) + 1;
         alert('Данные заказа успешно обновлены!');
     } catch (error) {
         console.error('Ошибка обновления данных заказа:', error);
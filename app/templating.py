@@ -0,0 +1,35 @@
+import time
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.config import settings
+from app.middleware.timing import current_stats
+from app.utils.assets import static_url
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    def TemplateResponse(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().TemplateResponse(*args, **kwargs)
+        finally:
+            stats = current_stats.get()
+            if stats is not None:
+                stats.template_time += time.perf_counter() - start
+
+    def precompile(self) -> int:
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+
+environment = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True,
+                          auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+                          bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR or None))
+environment.globals["static_url"] = static_url
+templates = InstrumentedTemplates(env=environment)
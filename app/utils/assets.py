@@ -0,0 +1,113 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from mimetypes import guess_type
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.utils.negotiation import accept_quality
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST = "dist"
+MANIFEST = STATIC_DIR / DIST / "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt"}
+# Preferred first: brotli is smaller, gzip is understood everywhere.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def load_manifest() -> dict[str, str]:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+manifest = load_manifest()
+
+
+def static_url(path: str) -> str:
+    # Without a build the plain files are served, so templates work in development as well.
+    return f"/static/{manifest.get(path, path)}"
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    dist = static_dir / DIST
+    shutil.rmtree(dist, ignore_errors=True)
+    dist.mkdir()
+
+    built = {}
+    for source in sorted(path for path in static_dir.rglob("*") if path.is_file() and dist not in path.parents):
+        name = source.relative_to(static_dir).as_posix()
+        content = source.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+
+        target = dist / source.relative_to(static_dir).with_name(f"{source.stem}.{digest}{source.suffix}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+        if source.suffix in COMPRESSIBLE:
+            # mtime=0 keeps the archives byte-identical between builds of the same content.
+            target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+
+        built[name] = target.relative_to(static_dir).as_posix()
+
+    (dist / "manifest.json").write_text(json.dumps(built, indent=2, sort_keys=True), encoding="utf-8")
+    return built
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dist_dir = os.path.realpath(os.path.join(self.directory, DIST))
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("accept-encoding", "")
+        # Only fingerprinted names may be cached forever; the plain ones have to be revalidated.
+        fingerprinted = os.path.realpath(full_path).startswith(self.dist_dir + os.sep)
+        headers = {"Cache-Control": IMMUTABLE if fingerprinted else "no-cache", "Vary": "Accept-Encoding"}
+
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if accept_quality(accept_encoding, encoding, wildcards=False) <= 0:
+                continue
+            try:
+                compressed_stat = os.stat(f"{full_path}{suffix}")
+            except FileNotFoundError:
+                continue
+
+            response = FileResponse(f"{full_path}{suffix}", status_code=status_code, stat_result=compressed_stat,
+                                    media_type=guess_type(full_path)[0] or "text/plain",
+                                    headers={**headers, "Content-Encoding": encoding})
+            break
+
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the files in app/static")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+
+    files = build()
+    print(f"built {len(files)} assets into {STATIC_DIR / DIST}" + ("" if brotli else " (gzip only, brotli is not installed)"))
@@ -0,0 +1,29 @@
+from typing import Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+INT4_MAX = 2 ** 31 - 1
+# SQLSTATE classes 22 (data exception) and 23 (integrity constraint violation) are caused by the input.
+INVALID_DATA_SQLSTATES = ("22", "23")
+
+
+async def copy_records(session: AsyncSession, model, keys: Sequence[str], records: Sequence[tuple]) -> None:
+    if not records:
+        return
+
+    connection = await session.connection()
+
+    if connection.dialect.driver == "asyncpg":
+        columns = [model.__mapper__.columns[key].name for key in keys]
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(model.__tablename__, records=records,
+                                                                      columns=columns)
+    else:
+        await session.execute(insert(model).values([dict(zip(keys, record)) for record in records]))
+
+
+def is_invalid_data(error: Exception) -> bool:
+    # SQLAlchemy keeps the SQLSTATE on the wrapped driver error, asyncpg's own errors carry it directly.
+    sqlstate = getattr(getattr(error, "orig", error), "sqlstate", None) or ""
+    return sqlstate.startswith(INVALID_DATA_SQLSTATES)
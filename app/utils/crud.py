@@ -0,0 +1,65 @@
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+# One bind parameter per id keeps a chunk under the 32767 parameter limit of one statement.
+EXISTING_IDS_CHUNK = 30_000
+VERSION_CONFLICT = "Запись была изменена другим пользователем, обновите данные и повторите попытку"
+
+
+def model_columns(model) -> list[InstrumentedAttribute]:
+    return [getattr(model, attr.key) for attr in model.__mapper__.column_attrs]
+
+
+async def update_returning(session: AsyncSession, model, id: int, values: dict[str, Any],
+                           previous: Sequence[InstrumentedAttribute] = (),
+                           version: Optional[int] = None) -> Optional[Row]:
+    columns = model_columns(model)
+    conditions = [model.id == id]
+
+    # Optimistic locking: the row only matches while nobody has written it since the client read it.
+    if version is not None:
+        conditions.append(model.version == version)
+    if values and hasattr(model, "version"):
+        values = {**values, "version": model.version + 1}
+
+    if not values:
+        query = select(*columns, *[column.label(f"old_{column.key}") for column in previous]).where(*conditions)
+    elif previous:
+        # Joining the row to a locked snapshot of itself lets RETURNING report the values before the update.
+        old = select(model.id, *previous).where(*conditions).with_for_update().subquery("old")
+        query = (
+            update(model)
+            .where(model.id == old.c.id)
+            .values(**values)
+            .returning(*columns, *[old.c[column.key].label(f"old_{column.key}") for column in previous]))
+    else:
+        query = update(model).where(*conditions).values(**values).returning(*columns)
+
+    result = await session.execute(query.execution_options(synchronize_session=False))
+    return result.one_or_none()
+
+
+async def delete_returning(session: AsyncSession, model, id: int) -> Optional[Row]:
+    query = delete(model).where(model.id == id).returning(*model_columns(model))
+
+    result = await session.execute(query.execution_options(synchronize_session=False))
+    return result.one_or_none()
+
+
+async def existing_ids(session: AsyncSession, model, ids: Sequence[int]) -> list[int]:
+    ids = sorted(set(ids))
+    found = []
+    for start in range(0, len(ids), EXISTING_IDS_CHUNK):
+        result = await session.execute(select(model.id).where(model.id.in_(ids[start:start + EXISTING_IDS_CHUNK])))
+        found += result.scalars().all()
+    return sorted(found)
+
+
+async def raise_update_error(session: AsyncSession, model, id: int, detail: str) -> None:
+    if await existing_ids(session, model, [id]):
+        raise HTTPException(status_code=409, detail=VERSION_CONFLICT)
+    raise HTTPException(status_code=404, detail=detail)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import re
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import TableVersion
+from app.models.db_engine import engine
+from app.templating import TEMPLATES_DIR
+from app.utils.assets import manifest
+from app.utils.negotiation import wants_json
+
+# Part of every ETag, so a deploy that changes the markup or the asset fingerprints invalidates cached pages.
+TEMPLATES_DIGEST = hashlib.sha1(
+    b"".join(path.read_bytes() for path in sorted(TEMPLATES_DIR.rglob("*.html")))
+    + json.dumps(manifest, sort_keys=True).encode()
+).hexdigest()[:12]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+# A row tag as sent by row_etag, or the bare "v{version}" the cards send.
+ROW_TAG = re.compile(r'"(?:[0-9a-z]+-)?v([0-9]+)"')
+
+
+def representation(request: Request) -> str:
+    # JSON and HTML are different representations, so they must never share a strong validator.
+    return "json" if wants_json(request) else TEMPLATES_DIGEST
+
+
+def row_etag(request: Request, version: int) -> dict:
+    return {"ETag": f'"{representation(request)}-v{version}"', "Vary": "Accept"}
+
+
+def if_match_version(request: Request) -> Optional[int]:
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+
+    for tag in header.split(","):
+        match = ROW_TAG.fullmatch(tag.strip())
+        if match:
+            return int(match.group(1))
+
+    # Weak or foreign tags can never match a row version under the strong comparison If-Match requires.
+    raise HTTPException(status_code=412, detail="Некорректный заголовок If-Match")
+
+
+def table_etag(*models):
+    tables = [model.__tablename__ for model in models]
+
+    async def dependency(request: Request, session: AsyncSession = Depends(engine.get_read_session)) -> dict:
+        # Read before the rows: a write landing in between can only make the tag older than the page, never newer.
+        result = await session.execute(
+            select(TableVersion.table, TableVersion.version).where(TableVersion.table.in_(tables)))
+        versions = dict(result.all())
+
+        etag = f'"{representation(request)}-{"-".join(str(versions.get(table, 0)) for table in tables)}"'
+        headers = {"ETag": etag, "Vary": "Accept"}
+        if etag_matches(request, etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+        return headers
+
+    return dependency
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import asyncpg
+
+from app.config import settings
+
+CHANNEL = "stock_changes"
+
+logger = logging.getLogger("app")
+
+
+class ChangeFeed:
+    def __init__(self, dsn: str, queue_size: int = 256, reconnect_delay: float = 2):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self.subscribers: set[asyncio.Queue] = set()
+        self.connected = False
+        self.connections = 0
+        self.notifications = 0
+        self.overflows = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def broadcast(self, event: str, data: str) -> None:
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                # A client that cannot keep up gets a single reset instead of an ever-growing backlog.
+                self.overflows += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("reset", "{}"))
+
+    def on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        self.notifications += 1
+        self.broadcast("change", payload)
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as error:
+                logger.warning(f"Change feed cannot connect: {error}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                await connection.add_listener(CHANNEL, self.on_notification)
+                self.connected = True
+                self.connections += 1
+                if self.connections > 1:
+                    # Whatever was committed while nobody listened is lost, so clients reload what they show.
+                    self.broadcast("reset", "{}")
+                await closed.wait()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                logger.warning(f"Change feed listener failed: {error}")
+            finally:
+                self.connected = False
+                if not connection.is_closed():
+                    await connection.close()
+
+            logger.warning("Change feed connection lost, reconnecting")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        # One LISTEN connection per worker, opened by the first subscriber rather than at startup.
+        self.start()
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+
+    async def stream(self, keepalive: float) -> AsyncIterator[str]:
+        async with self.subscribe() as queue:
+            yield f"retry: {int(self.reconnect_delay * 1000)}\n\n"
+
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    # Comment lines keep proxies from closing idle connections.
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield f"event: {event}\ndata: {data}\n\n"
+
+    def status(self) -> dict:
+        return {
+            "connected": self.connected,
+            "connections": self.connections,
+            "subscribers": len(self.subscribers),
+            "notifications": self.notifications,
+            "overflows": self.overflows,
+        }
+
+
+feed = ChangeFeed(dsn=settings.listen_url, queue_size=settings.FEED_QUEUE_SIZE,
+                  reconnect_delay=settings.FEED_RECONNECT_SECONDS)
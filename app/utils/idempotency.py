@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+from typing import Any, Optional
+
+import orjson
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.base import IdempotencyKey
+from app.models.db_engine import engine
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger("app")
+
+
+class IdempotentReplay(HTTPException):
+    def __init__(self, status_code: int, response: str):
+        super().__init__(status_code=status_code)
+        self.response = response
+
+
+def idempotent_replay_handler(request: Request, exc: IdempotentReplay) -> ORJSONResponse:
+    return ORJSONResponse(orjson.loads(exc.response), status_code=exc.status_code,
+                          headers={"Idempotent-Replayed": "true"})
+
+
+def expiry() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+class Idempotency:
+    def __init__(self, key: Optional[str], fingerprint: str):
+        self.key = key
+        self.fingerprint = fingerprint
+
+    async def replay(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response)
+            .where(IdempotencyKey.key == self.key, IdempotencyKey.created_at >= expiry()))
+        stored = result.one_or_none()
+
+        if stored is None:
+            return
+        if stored.fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Ключ идемпотентности уже использован для другого запроса")
+        raise IdempotentReplay(stored.status_code, stored.response)
+
+    async def save(self, session: AsyncSession, content: Any, status_code: int = 200) -> None:
+        if self.key is None:
+            return
+
+        values = {"key": self.key, "fingerprint": self.fingerprint, "status_code": status_code,
+                  "response": orjson.dumps(content).decode(), "created_at": datetime.datetime.now(datetime.timezone.utc)}
+        upsert = insert(IdempotencyKey).values(**values)
+        # An expired key that eviction has not reached yet is simply taken over.
+        query = upsert.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={column.expression.name: upsert.excluded[column.expression.name]
+                  for column in (IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response,
+                                 IdempotencyKey.created_at)},
+            where=IdempotencyKey.created_at < expiry(),
+        ).returning(IdempotencyKey.key)
+
+        result = await session.execute(query)
+        if result.scalar_one_or_none() is None:
+            # A concurrent retry committed first: drop this write and answer the way that one did.
+            await session.rollback()
+            await self.replay(session)
+            raise HTTPException(status_code=409, detail="Запрос с этим ключом идемпотентности уже выполняется")
+
+
+async def idempotency_key(request: Request, session: AsyncSession = Depends(engine.get_session)) -> Idempotency:
+    key = request.headers.get(HEADER)
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Некорректный ключ идемпотентности")
+
+    fingerprint = hashlib.sha256(request.method.encode() + request.url.path.encode() + await request.body()).hexdigest()
+    idempotency = Idempotency(key, fingerprint)
+
+    if key is not None:
+        await idempotency.replay(session)
+
+    return idempotency
+
+
+async def evict_expired(session: AsyncSession, batch: int) -> int:
+    evicted = 0
+    while True:
+        expired = select(IdempotencyKey.key).where(IdempotencyKey.created_at < expiry()).limit(batch)
+        result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired)))
+        await session.commit()
+
+        evicted += result.rowcount
+        if result.rowcount < batch:
+            return evicted
+
+
+async def run_eviction(interval: float, batch: int) -> None:
+    while True:
+        try:
+            async with engine.session_factory() as session:
+                evicted = await evict_expired(session, batch)
+            if evicted:
+                logger.info(f"Evicted {evicted} expired idempotency keys")
+        except (SQLAlchemyError, OSError) as error:
+            logger.warning(f"Idempotency key eviction failed: {error}")
+
+        await asyncio.sleep(interval)
@@ -0,0 +1,67 @@
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Row
+
+from app.utils.pagination import Page
+
+
+def accept_quality(accept: str, media_type: str, wildcards: bool = True) -> float:
+    main_type = media_type.split("/")[0]
+    matches = (media_type, f"{main_type}/*", "*/*") if wildcards else (media_type,)
+    quality = 0.0
+
+    for part in accept.split(","):
+        media, *params = [item.strip() for item in part.split(";")]
+        if media not in matches:
+            continue
+
+        value = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    value = float(param[2:])
+                except ValueError:
+                    value = 0.0
+        quality = max(quality, value)
+
+    return quality
+
+
+def wants_json(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    # Wildcards keep serving HTML; JSON has to be asked for explicitly.
+    json = accept_quality(accept, "application/json", wildcards=False)
+    return json > 0 and json >= accept_quality(accept, "text/html")
+
+
+def rows_to_dicts(rows: list[Row]) -> list[dict]:
+    if not rows:
+        return []
+
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def page_links(request: Request, page: Page) -> Optional[str]:
+    links = []
+    for rel, param, cursor in (("next", "after", page.next_cursor), ("prev", "before", page.prev_cursor)):
+        if cursor is not None:
+            url = request.url.remove_query_params(["after", "before"]).include_query_params(**{param: cursor})
+            links.append(f'<{url}>; rel="{rel}"')
+
+    return ", ".join(links) or None
+
+
+def json_page(request: Request, page: Page, headers: Optional[dict] = None) -> ORJSONResponse:
+    headers = dict(headers or {})
+    links = page_links(request, page)
+    if links:
+        headers["Link"] = links
+
+    return ORJSONResponse(rows_to_dicts(page.items), headers=headers)
+
+
+def json_row(row: Row, headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse(row._asdict(), headers=headers)
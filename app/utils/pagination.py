@@ -0,0 +1,61 @@
+from typing import Any, Optional
+
+from fastapi import Query
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.config import settings
+
+
+class PageParams(BaseModel):
+    limit: int
+    after: Optional[int] = None
+    before: Optional[int] = None
+
+
+class Page(BaseModel):
+    items: list[Any]
+    limit: int
+    next_cursor: Optional[int] = None
+    prev_cursor: Optional[int] = None
+
+
+def page_params(limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+                after: Optional[int] = Query(None), before: Optional[int] = Query(None)) -> PageParams:
+    return PageParams(limit=limit, after=after, before=before)
+
+
+async def paginate(session: AsyncSession, query: Select, key: InstrumentedAttribute, params: PageParams,
+                   scalars: bool = False) -> Page:
+    backwards = params.before is not None
+
+    if backwards:
+        query = query.where(key < params.before).order_by(key.desc())
+    else:
+        if params.after is not None:
+            query = query.where(key > params.after)
+        query = query.order_by(key)
+
+    result = await session.execute(query.limit(params.limit + 1))
+    rows = list(result.scalars().all() if scalars else result.all())
+
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+    if backwards:
+        rows.reverse()
+
+    page = Page(items=rows, limit=params.limit)
+    if not rows:
+        return page
+
+    first, last = getattr(rows[0], key.key), getattr(rows[-1], key.key)
+    if backwards:
+        page.prev_cursor = first if has_more else None
+        page.next_cursor = last
+    else:
+        page.prev_cursor = first if params.after is not None else None
+        page.next_cursor = last if has_more else None
+
+    return page
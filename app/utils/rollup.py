@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import datetime
+import sys
+
+from sqlalchemy import Select, and_, delete, func, literal, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import Order, SalesRecord, SalesRollup
+from app.models.db_engine import engine
+
+KEYS = [SalesRollup.date, SalesRollup.product_id, SalesRollup.buyer_id]
+VALUES = [SalesRollup.quantity, SalesRollup.revenue, SalesRollup.sales]
+REVENUE_TOLERANCE = 0.005
+
+
+def sale_facts(sign: int, *conditions) -> Select:
+    return (
+        select(SalesRecord.date, Order.product_id, SalesRecord.buyer_id, Order.product_quantity * sign,
+               Order.total_cost * sign, literal(sign))
+        .join(Order, Order.id == SalesRecord.order_id)
+        .where(*conditions))
+
+
+def removed_sale_facts(date: datetime.date, order_id: int, buyer_id: int) -> Select:
+    return select(literal(date, SalesRecord.date.type), Order.product_id, literal(buyer_id), -Order.product_quantity,
+                  -Order.total_cost, literal(-1)).where(Order.id == order_id)
+
+
+def removed_order_facts(id: int, product_id: int, product_quantity: int, total_cost: float) -> Select:
+    return select(SalesRecord.date, literal(product_id), SalesRecord.buyer_id, literal(-product_quantity),
+                  literal(-total_cost), literal(-1)).where(SalesRecord.order_id == id)
+
+
+async def lock_orders(session: AsyncSession, *order_ids: int) -> None:
+    # A sale's facts read its order. Holding the order until commit stops a concurrent order edit from changing
+    # its quantity or cost between that read and this rollup, and the order edit then sees the committed sale.
+    await session.execute(
+        select(Order.id).where(Order.id.in_(set(order_ids))).order_by(Order.id).with_for_update(read=True))
+
+
+async def rollup_sales(session: AsyncSession, *facts: Select) -> None:
+    # An edit passes its removed and added facts together, so all of its rollup rows are locked by one statement.
+    facts = (union_all(*facts) if len(facts) > 1 else facts[0]).subquery("facts")
+    date, product_id, buyer_id, quantity, revenue, sales = facts.c
+
+    # Grouping first keeps ON CONFLICT from touching the same rollup row twice in one statement, and the key
+    # order makes concurrent edits lock shared rollup rows in the same order instead of deadlocking.
+    deltas = (
+        select(date, product_id, buyer_id, func.sum(quantity), func.sum(revenue), func.sum(sales))
+        .group_by(date, product_id, buyer_id)
+        .order_by(date, product_id, buyer_id))
+
+    upsert = insert(SalesRollup).from_select(KEYS + VALUES, deltas)
+    query = upsert.on_conflict_do_update(
+        index_elements=KEYS,
+        set_={value.expression.name: value + upsert.excluded[value.expression.name] for value in VALUES},
+    ).returning(*KEYS, SalesRollup.sales)
+
+    result = await session.execute(query)
+
+    emptied = sorted(tuple(row[:3]) for row in result if row[3] == 0)
+    if emptied:
+        await session.execute(delete(SalesRollup).where(tuple_(*KEYS).in_(emptied)))
+
+
+def aggregated_sales() -> Select:
+    return (
+        select(SalesRecord.date, Order.product_id, SalesRecord.buyer_id, func.sum(Order.product_quantity),
+               func.sum(Order.total_cost), func.count())
+        .join(Order, Order.id == SalesRecord.order_id)
+        .group_by(SalesRecord.date, Order.product_id, SalesRecord.buyer_id))
+
+
+async def rebuild(session: AsyncSession) -> int:
+    await session.execute(delete(SalesRollup))
+    result = await session.execute(SalesRollup.__table__.insert().from_select(KEYS + VALUES, aggregated_sales()))
+    return result.rowcount
+
+
+async def inconsistencies(session: AsyncSession, limit: int = 20) -> list[dict]:
+    expected = aggregated_sales().subquery("expected")
+    rollup = SalesRollup.__table__.alias("rollup")
+    keys = [(expected.c[index], rollup.c[column.expression.name]) for index, column in enumerate(KEYS)]
+
+    expected_values = [func.coalesce(expected.c[index], 0) for index in range(3, 6)]
+    rollup_values = [func.coalesce(rollup.c[column.expression.name], 0) for column in VALUES]
+
+    query = (
+        select(*[func.coalesce(left, right).label(column.key) for (left, right), column in zip(keys, KEYS)],
+               *[value.label(f"expected_{column.key}") for value, column in zip(expected_values, VALUES)],
+               *[value.label(f"rollup_{column.key}") for value, column in zip(rollup_values, VALUES)])
+        .select_from(expected.outerjoin(rollup, and_(*[left == right for left, right in keys]), full=True))
+        .where(or_(expected_values[0] != rollup_values[0],
+                   func.abs(expected_values[1] - rollup_values[1]) > REVENUE_TOLERANCE,
+                   expected_values[2] != rollup_values[2]))
+        .limit(limit))
+
+    result = await session.execute(query)
+    return [row._asdict() for row in result]
+
+
+async def main(command: str, limit: int) -> int:
+    async with engine.session_factory() as session:
+        if command == "rebuild":
+            rows = await rebuild(session)
+            await session.commit()
+            print(f"rebuilt {rows} rollup rows")
+            mismatches = []
+        else:
+            mismatches = await inconsistencies(session, limit)
+    await engine.dispose()
+
+    for mismatch in mismatches:
+        print(", ".join(f"{key}={value}" for key, value in mismatch.items()))
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the daily sales rollup")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--limit", type=int, default=20, help="mismatches to report")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.command, args.limit)))
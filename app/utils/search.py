@@ -0,0 +1,27 @@
+from sqlalchemy import case, func, literal, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.config import settings
+
+
+def escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+async def search(session: AsyncSession, id_column: InstrumentedAttribute, column: InstrumentedAttribute, q: str,
+                 limit: int) -> list:
+    prefix = column.ilike(escape_like(q) + "%", escape="/")
+    score = func.word_similarity(q, column)
+
+    # `q <% column` is the word-similarity operator that the gin_trgm_ops indexes can serve.
+    query = (
+        select(id_column.label("id"), column.label("value"), score.label("score"))
+        .where(or_(prefix, literal(q).op("<%")(column)))
+        .order_by(case((prefix, 0), else_=1), score.desc(), column)
+        .limit(limit))
+
+    await session.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                          {"threshold": str(settings.SEARCH_SIMILARITY_THRESHOLD)})
+    result = await session.execute(query)
+    return result.all()
@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import hmac
+import re
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+
+from app.config import settings
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+# Read once at import, so verifying a request touches neither the database nor the settings object.
+SECRET = settings.SESSION_SECRET.encode()
+TTL_SECONDS = settings.SESSION_TTL_SECONDS
+COOKIE = settings.SESSION_COOKIE
+CACHE_SIZE = settings.SESSION_CACHE_SIZE
+
+# role.expires.signature, with the signature an unpadded urlsafe base64 SHA-256 digest.
+TOKEN_PATTERN = re.compile(r"[a-z]+\.[0-9]+\.[A-Za-z0-9_-]{43}")
+
+# Only tokens that verified are kept, so a stream of forged ones cannot push the real ones out.
+verified_tokens: dict[str, tuple[str, int]] = {}
+
+
+def digest(message: str) -> bytes:
+    return hmac.new(SECRET, message.encode(), hashlib.sha256).digest()
+
+
+def sign(message: str) -> str:
+    return base64.urlsafe_b64encode(digest(message)).rstrip(b"=").decode()
+
+
+def issue_token(role: str) -> str:
+    message = f"{role}.{int(time.time()) + TTL_SECONDS}"
+    return f"{message}.{sign(message)}"
+
+
+def verify_signature(token: str) -> Optional[tuple[str, int]]:
+    if token in verified_tokens:
+        return verified_tokens[token]
+    # Headers and cookies arrive decoded as latin-1, so anything outside the token alphabet is rejected here.
+    if not TOKEN_PATTERN.fullmatch(token):
+        return None
+
+    message, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(base64.urlsafe_b64decode(signature + "="), digest(message)):
+        return None
+
+    role, _, expires = message.partition(".")
+    if len(verified_tokens) >= CACHE_SIZE:
+        del verified_tokens[next(iter(verified_tokens))]
+    verified_tokens[token] = role, int(expires)
+    return verified_tokens[token]
+
+
+def session_role(request: Request, bearer: Optional[str] = Depends(oauth2_scheme)) -> Optional[str]:
+    token = bearer or request.cookies.get(COOKIE)
+    if not token:
+        return None
+
+    # The signature check is cached; only the expiry has to be compared on every request.
+    verified = verify_signature(token)
+    if verified is None or verified[1] < time.time():
+        return None
+    return verified[0]
+
+
+def require_role(*roles: str):
+    def dependency(role: Optional[str] = Depends(session_role)) -> str:
+        if role is None:
+            raise HTTPException(status_code=401, detail="Требуется авторизация", headers={"WWW-Authenticate": "Bearer"})
+        if role not in roles:
+            raise HTTPException(status_code=403, detail="Недостаточно прав")
+        return role
+
+    return dependency
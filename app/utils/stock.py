@@ -0,0 +1,106 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, cast, column, or_, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import Product
+
+# Three bind parameters per row keeps a chunk well under the 32767 parameter limit of one statement.
+SET_STOCKS_CHUNK = 10_000
+
+
+async def raise_stock_error(session: AsyncSession, product_ids) -> None:
+    result = await session.execute(select(Product.id).where(Product.id.in_(product_ids)))
+    missing = set(product_ids) - set(result.scalars().all())
+
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Товар {min(missing)} не найден")
+    raise HTTPException(status_code=409, detail="Недостаточно товара на складе")
+
+
+async def move_stock(session: AsyncSession, product_id: int, delta: int) -> int:
+    query = (
+        update(Product)
+        .where(Product.id == product_id, Product.stock + delta >= 0)
+        .values(stock=Product.stock + delta, version=Product.version + 1)
+        .returning(Product.stock)
+        .execution_options(synchronize_session=False))
+
+    result = await session.execute(query)
+    stock = result.scalar_one_or_none()
+
+    if stock is None:
+        await raise_stock_error(session, [product_id])
+
+    return stock
+
+
+async def move_stocks(session: AsyncSession, deltas: dict[int, int]) -> None:
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+
+    if len(deltas) == 1:
+        await move_stock(session, *deltas.popitem())
+        return
+    if not deltas:
+        return
+
+    movements = values(column("id", Integer), column("delta", Integer), name="movements").data(sorted(deltas.items()))
+    query = (
+        update(Product)
+        .where(Product.id == movements.c.id, Product.stock + movements.c.delta >= 0)
+        .values(stock=Product.stock + movements.c.delta, version=Product.version + 1)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False))
+
+    result = await session.execute(query)
+
+    if len(result.all()) != len(deltas):
+        await raise_stock_error(session, list(deltas))
+
+
+async def set_stocks(session: AsyncSession, counts: dict[int, int],
+                     versions: Optional[dict[int, int]] = None) -> list[int]:
+    versions = versions or {}
+    items = sorted((product_id, count, versions.get(product_id)) for product_id, count in counts.items())
+    updated = []
+
+    if len(items) == 1:
+        product_id, count, version = items[0]
+        conditions = [Product.id == product_id]
+        if version is not None:
+            conditions.append(Product.version == version)
+
+        query = (
+            update(Product)
+            .where(*conditions)
+            .values(stock=count, version=Product.version + 1)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False))
+
+        result = await session.execute(query)
+        return [] if result.scalar_one_or_none() else [product_id]
+
+    for start in range(0, len(items), SET_STOCKS_CHUNK):
+        counts_values = (
+            values(column("id", Integer), column("count", Integer), column("version", Integer), name="counts")
+            .data(items[start:start + SET_STOCKS_CHUNK]))
+        query = (
+            update(Product)
+            .where(Product.id == counts_values.c.id,
+                   # A chunk without any version is a column of bare NULLs, which Postgres types as text.
+                   or_(counts_values.c.version.is_(None), Product.version == cast(counts_values.c.version, Integer)))
+            .values(stock=counts_values.c.count, version=Product.version + 1)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False))
+
+        result = await session.execute(query)
+        updated += result.scalars().all()
+
+    return sorted(set(counts) - set(updated))
+
+
+def stock_deltas(old_product_id: int, old_delta: int, new_product_id: int, new_delta: int) -> dict[int, int]:
+    deltas = {old_product_id: -old_delta}
+    deltas[new_product_id] = deltas.get(new_product_id, 0) + new_delta
+    return deltas
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import datetime
+import random
+import time
+
+from sqlalchemy import text
+
+from app.models.base import Buyer, Description, Order, Product, Provider, SalesRecord, StockRecord
+from app.models.db_engine import engine
+from app.utils.bulk import copy_records
+from app.utils.rollup import rebuild
+from app.utils.stock import move_stocks
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BATCH_SIZE = 50_000
+
+FURNITURE_TYPES = ["Стол", "Стул", "Шкаф", "Диван", "Кровать", "Комод", "Тумба", "Кресло", "Полка", "Стеллаж"]
+MATERIALS = ["дуб", "сосна", "бук", "ЛДСП", "МДФ", "металл", "стекло", "ротанг"]
+SURNAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков",
+            "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов", "Козлов"]
+NAMES = ["Александр", "Алексей", "Андрей", "Дмитрий", "Иван", "Михаил", "Николай", "Олег", "Сергей", "Юрий"]
+PATRONYMICS = ["Александрович", "Викторович", "Иванович", "Олегович", "Петрович", "Сергеевич"]
+ORGANIZATION_KINDS = ["ООО", "АО", "ИП", "ПАО"]
+ORGANIZATION_WORDS = ["Мебель", "Интерьер", "Дом", "Уют", "Комфорт", "Опт", "Снаб", "Трейд", "Лес", "Мастер"]
+STREETS = ["Ленина", "Мира", "Садовая", "Советская", "Лесная", "Школьная", "Новая", "Центральная"]
+CITIES = ["Москва", "Казань", "Пермь", "Самара", "Омск", "Тверь", "Тула", "Уфа"]
+
+TABLES = [Description, Provider, Buyer, Product, Order, SalesRecord, StockRecord]
+
+
+def table_sizes(sales: int) -> dict:
+    return {
+        Description: min(len(FURNITURE_TYPES) * len(MATERIALS) * 5, max(50, sales // 1000)),
+        Provider: max(20, sales // 2000),
+        Buyer: max(100, sales // 20),
+        Product: max(200, sales // 100),
+        Order: sales,
+        SalesRecord: sales,
+        StockRecord: max(200, sales // 4),
+    }
+
+
+def organization(rng: random.Random) -> str:
+    return f'{rng.choice(ORGANIZATION_KINDS)} "{rng.choice(ORGANIZATION_WORDS)}{rng.choice(ORGANIZATION_WORDS).lower()}"'
+
+
+def phone(rng: random.Random) -> str:
+    return f"+7 9{rng.randint(0, 99):02d} {rng.randint(0, 999):03d}-{rng.randint(0, 99):02d}-{rng.randint(0, 99):02d}"
+
+
+def random_date(rng: random.Random, start: datetime.date, days: int) -> datetime.date:
+    return start + datetime.timedelta(days=rng.randrange(days))
+
+
+async def copy_batches(model, keys: list[str], records) -> None:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            async with engine.session_factory() as session:
+                await copy_records(session, model, keys, batch)
+                await session.commit()
+            batch = []
+
+    if batch:
+        async with engine.session_factory() as session:
+            await copy_records(session, model, keys, batch)
+            await session.commit()
+
+
+async def generate(sales: int, seed: int, days: int) -> dict:
+    rng = random.Random(seed)
+    sizes = table_sizes(sales)
+    start = datetime.date.today() - datetime.timedelta(days=days)
+
+    def descriptions():
+        for id in range(1, sizes[Description] + 1):
+            yield (id, rng.choice(FURNITURE_TYPES), rng.choice(MATERIALS), rng.randint(2, 120),
+                   f"{rng.randint(30, 220)}x{rng.randint(30, 120)}x{rng.randint(40, 220)}")
+
+    def providers():
+        for id in range(1, sizes[Provider] + 1):
+            yield id, organization(rng), phone(rng), f"sales{id}@provider{id % 97}.ru"
+
+    def buyers():
+        for id in range(1, sizes[Buyer] + 1):
+            yield (id, f"{rng.choice(SURNAMES)} {rng.choice(NAMES)} {rng.choice(PATRONYMICS)}", organization(rng),
+                   phone(rng), f"г. {rng.choice(CITIES)}, ул. {rng.choice(STREETS)}, д. {rng.randint(1, 150)}")
+
+    prices = [round(rng.uniform(1_500, 150_000), 2) for _ in range(sizes[Product])]
+
+    def products():
+        for id, price in enumerate(prices, start=1):
+            yield id, rng.randint(1, sizes[Description]), price, 0, rng.randint(1, sizes[Provider])
+
+    ordered = [0] * (sizes[Product] + 1)
+
+    def orders():
+        for id in range(1, sizes[Order] + 1):
+            # A log-uniform product choice gives the analytics and top-N queries a realistic long tail.
+            product_id = int(sizes[Product] ** rng.random())
+            quantity = rng.randint(1, 10)
+            ordered[product_id] += quantity
+            yield id, quantity, round(prices[product_id - 1] * quantity, 2), product_id
+
+    def sales_records():
+        for id in range(1, sizes[SalesRecord] + 1):
+            yield id, random_date(rng, start, days), id, rng.randint(1, sizes[Buyer])
+
+    received = [0] * (sizes[Product] + 1)
+
+    def stock_records():
+        # Every product is supplied at least as much as was ever ordered, so the stock never goes negative.
+        for id in range(1, sizes[StockRecord] + 1):
+            product_id = (id - 1) % sizes[Product] + 1
+            remaining = max(0, ordered[product_id] - received[product_id])
+            periods = (sizes[StockRecord] - id) // sizes[Product] + 1
+            quantity = -(-remaining // periods) + rng.randint(0, 20)
+            received[product_id] += quantity
+            yield id, random_date(rng, start, days), product_id, quantity
+
+    generators = {
+        Description: (["id", "furniture_type", "material", "weight", "dimensions"], descriptions),
+        Provider: (["id", "organization_name", "phone_number", "email"], providers),
+        Buyer: (["id", "full_name", "organization_name", "phone_number", "address"], buyers),
+        Product: (["id", "description_id", "price", "stock", "provider_id"], products),
+        Order: (["id", "product_quantity", "total_cost", "product_id"], orders),
+        SalesRecord: (["id", "date", "order_id", "buyer_id"], sales_records),
+        StockRecord: (["id", "date", "product_id", "quantity"], stock_records),
+    }
+
+    for model in TABLES:
+        keys, records = generators[model]
+        started = time.perf_counter()
+        await copy_batches(model, keys, records())
+        print(f"{model.__tablename__:<16}{sizes[model]:>12,} rows  {time.perf_counter() - started:8.1f} s")
+
+    # Chunked to stay under the bind parameter limit of a single statement.
+    for first in range(1, sizes[Product] + 1, 10_000):
+        last = min(first + 10_000, sizes[Product] + 1)
+        async with engine.session_factory() as session:
+            await move_stocks(session, {id: received[id] - ordered[id] for id in range(first, last)})
+            await session.commit()
+
+    return sizes
+
+
+async def reset_sequences() -> None:
+    async with engine.session_factory() as session:
+        for model in TABLES:
+            table = model.__tablename__
+            await session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'код'), "
+                f"COALESCE((SELECT max(\"код\") FROM \"{table}\"), 0) + 1, false)"))
+        await session.commit()
+
+
+async def main(sales: int, seed: int, days: int, truncate: bool) -> None:
+    if truncate:
+        async with engine.session_factory() as session:
+            tables = ", ".join(f'"{model.__tablename__}"' for model in TABLES)
+            await session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+            await session.commit()
+
+    await generate(sales, seed, days)
+    await reset_sequences()
+
+    async with engine.session_factory() as session:
+        print(f"{'Сводка_продаж':<16}{await rebuild(session):>12,} rows")
+        await session.commit()
+
+    async with engine.session_factory() as session:
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill every table with consistent synthetic warehouse data")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="number of sales to generate")
+    parser.add_argument("--sales", type=int, help="exact number of sales, overrides --scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=730, help="spread sale and supply dates over this many days")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables before generating")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sales or SCALES[args.scale], args.seed, args.days, args.truncate))
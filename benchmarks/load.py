@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.base import Buyer, Description, Order, Product
+from app.models.db_engine import engine
+
+JSON = {"Accept": "application/json"}
+# Running out of stock is a legitimate answer under load, not a server failure.
+EXPECTED_STATUSES = {409}
+
+
+class RouteStats:
+    def __init__(self):
+        self.timings = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    def observe(self, elapsed: float, status: int) -> None:
+        self.timings.append(elapsed * 1000)
+        self.statuses[status] += 1
+        self.errors += status >= 400 and status not in EXPECTED_STATUSES
+
+    def summary(self, duration: float) -> dict:
+        timings = sorted(self.timings)
+        count = len(timings)
+
+        def percentile(value: float) -> float:
+            return round(timings[max(int(count * value) - 1, 0)], 3) if timings else 0.0
+
+        return {
+            "requests": count,
+            "rps": round(count / duration, 2),
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "statuses": {str(status): number for status, number in sorted(self.statuses.items())},
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(timings[-1], 3) if timings else 0.0,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, data: dict, stats: defaultdict, rng: random.Random):
+        self.client = client
+        self.data = data
+        self.stats = stats
+        self.rng = rng
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            await response.aread()
+        except httpx.HTTPError:
+            self.stats[route].observe(time.perf_counter() - start, 599)
+            return None
+
+        self.stats[route].observe(time.perf_counter() - start, response.status_code)
+        return response
+
+    async def login(self, password: str) -> None:
+        response = await self.call("POST /token", "POST", "/token", headers=JSON,
+                                   data={"username": "storekeeper", "password": password})
+
+        if response is not None and response.status_code == 200:
+            self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    async def browse_products(self) -> None:
+        response = await self.call("GET /storekeeper/products-info", "GET", "/storekeeper/products-info")
+
+        # Some users page on through the keyset cursor the way the pagination links do.
+        if response is not None and self.rng.random() < 0.3:
+            await self.call("GET /storekeeper/products-info", "GET", "/storekeeper/products-info",
+                            params={"after": self.rng.choice(self.data["products"])})
+
+    async def filter_products(self) -> None:
+        await self.call("GET /storekeeper/products-info-filtered", "GET", "/storekeeper/products-info-filtered",
+                        params={"furniture_type": self.rng.choice(self.data["furniture_types"])})
+
+    async def browse_tables(self) -> None:
+        path = self.rng.choice(["/storekeeper/sales-info", "/storekeeper/stocks-info", "/storekeeper/orders-info",
+                                "/storekeeper/providers-info"])
+        await self.call(f"GET {path}", "GET", path, headers=self.rng.choice([{}, JSON]))
+
+    async def post_order(self) -> None:
+        product_id = self.rng.choice(self.data["products"])
+        quantity = self.rng.randint(1, 3)
+        await self.call("POST /orders", "POST", "/orders", json={
+            "product_id": product_id,
+            "product_quantity": quantity,
+            "total_cost": round(self.data["prices"][product_id] * quantity, 2),
+        })
+
+    async def post_sale(self) -> None:
+        await self.call("POST /sales-accounting", "POST", "/sales-accounting", json={
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "order_id": self.rng.choice(self.data["orders"]),
+            "buyer_id": self.rng.choice(self.data["buyers"]),
+        })
+
+    async def patch_stock(self) -> None:
+        await self.call("PATCH /storekeeper/products", "PATCH", "/storekeeper/products",
+                        json={"id": self.rng.choice(self.data["products"]), "count": self.rng.randint(100, 1000)})
+
+
+SCENARIO = [
+    (VirtualUser.browse_products, 30),
+    (VirtualUser.filter_products, 15),
+    (VirtualUser.browse_tables, 30),
+    (VirtualUser.post_order, 10),
+    (VirtualUser.post_sale, 8),
+    (VirtualUser.patch_stock, 7),
+]
+
+
+async def sample_data(size: int = 1000) -> dict:
+    async with engine.session_factory() as session:
+        async def ids(column) -> list[int]:
+            return list((await session.execute(select(column).order_by(func.random()).limit(size))).scalars())
+
+        products = (await session.execute(select(Product.id, Product.price).order_by(func.random()).limit(size))).all()
+        furniture_types = (await session.execute(select(Description.furniture_type).distinct())).scalars()
+
+        data = {
+            "products": [product.id for product in products],
+            "prices": {product.id: product.price for product in products},
+            "orders": await ids(Order.id),
+            "buyers": await ids(Buyer.id),
+            "furniture_types": list(furniture_types),
+        }
+
+    missing = [name for name, values in data.items() if not values]
+    if missing:
+        raise SystemExit(f"no data in: {', '.join(missing)}; run benchmarks.generate_data first")
+
+    return data
+
+
+async def user_loop(client: httpx.AsyncClient, data: dict, stats: defaultdict, seed: int, password: str,
+                    start_delay: float, deadline: float, think_time: float) -> None:
+    rng = random.Random(seed)
+    user = VirtualUser(client, data, stats, rng)
+    actions, weights = zip(*SCENARIO)
+
+    await asyncio.sleep(start_delay)
+    await user.login(password)
+
+    while time.monotonic() < deadline:
+        await rng.choices(actions, weights)[0](user)
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def run(args) -> dict:
+    data = await sample_data()
+    stats = defaultdict(RouteStats)
+
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://load"
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    started = time.monotonic()
+    deadline = started + args.ramp_up + args.duration
+
+    async def session(number: int) -> None:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout,
+                                     limits=limits) as client:
+            await user_loop(client, data, stats, args.seed + number, args.password,
+                            args.ramp_up * number / args.users, deadline, args.think_time)
+
+    await asyncio.gather(*(session(number) for number in range(args.users)))
+    duration = time.monotonic() - started
+
+    routes = {route: route_stats.summary(duration) for route, route_stats in sorted(stats.items())}
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.timings += route_stats.timings
+        total.statuses += route_stats.statuses
+        total.errors += route_stats.errors
+
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "target": base_url,
+            "users": args.users,
+            "duration_s": round(duration, 2),
+            "think_time_s": args.think_time,
+        },
+        "total": total.summary(duration),
+        "routes": routes,
+    }
+
+
+def check_thresholds(report: dict, thresholds: dict) -> list[str]:
+    failures = []
+    default = thresholds.get("default", {})
+
+    for route, summary in [("total", report["total"])] + list(report["routes"].items()):
+        limits = thresholds.get("total", {}) if route == "total" else {**default, **thresholds.get("routes", {}).get(route, {})}
+
+        for key, limit in limits.items():
+            if key == "min_rps":
+                if summary["rps"] < limit:
+                    failures.append(f"{route}: rps {summary['rps']} < {limit}")
+            elif summary.get(key, 0) > limit:
+                failures.append(f"{route}: {key} {summary[key]} > {limit}")
+
+    return failures
+
+
+def print_report(report: dict) -> None:
+    print(f"{'route':<42}{'requests':>9}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for route, summary in list(report["routes"].items()) + [("total", report["total"])]:
+        print(f"{route:<42}{summary['requests']:>9}{summary['rps']:>9.1f}{summary['p50_ms']:>10.2f}"
+              f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}{summary['error_rate']:>9.2%}")
+
+
+async def main(args) -> int:
+    report = await run(args)
+    await engine.dispose()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if not args.thresholds:
+        return 0
+
+    with open(args.thresholds, encoding="utf-8") as file:
+        failures = check_thresholds(report, json.load(file))
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the storekeeper workflow with concurrent virtual users")
+    parser.add_argument("--base-url", default="", help="load a running server instead of the app in-process")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of full load after the ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between actions in seconds")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--password", default=settings.STOREKEEPER_PASSWORD)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--thresholds", help="JSON file with pass/fail limits, exits with 1 when one is exceeded")
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.base import Buyer, Description, Order, Product, Provider, SalesRecord, StockRecord
+from app.models.db_engine import engine
+
+JSON = {"Accept": "application/json"}
+
+
+async def sample_values() -> dict:
+    async with engine.session_factory() as session:
+        values = {}
+        for name, column in (("buyer", Buyer.id), ("description", Description.id), ("order", Order.id),
+                             ("product", Product.id), ("provider", Provider.id), ("sale", SalesRecord.id),
+                             ("stock", StockRecord.id)):
+            # The median id lands in the middle of the keyset index rather than on its first page.
+            values[name] = (await session.execute(select(func.percentile_disc(0.5).within_group(column)))).scalar()
+
+        # Orders and receipts all go to the best stocked product, so the run does not fail on an empty shelf.
+        values["stocked_product"] = (await session.execute(
+            select(Product.id).order_by(Product.stock.desc()).limit(1))).scalar()
+        values["full_name"] = (await session.execute(select(Buyer.full_name).limit(1))).scalar()
+        values["organization_name"] = (await session.execute(select(Provider.organization_name).limit(1))).scalar()
+        values["furniture_type"] = (await session.execute(select(Description.furniture_type).limit(1))).scalar()
+
+    return values
+
+
+def endpoints(values: dict) -> list[tuple[str, str, dict]]:
+    routes = [
+        ("products", "/products", {}),
+        ("product", f"/products/{values['product']}", {}),
+        ("products.after", f"/products?after={values['product']}", {}),
+        ("orders", "/orders", {}),
+        ("order", f"/orders/{values['order']}", {}),
+        ("buyers", "/buyers", {}),
+        ("buyer", f"/buyers/{values['buyer']}", {}),
+        ("buyers.filtered", "/buyers-filtered", {"full_name": values["full_name"]}),
+        ("buyers.search", "/buyers-search", {"q": values["full_name"][:4]}),
+        ("providers", "/providers", {}),
+        ("provider", f"/providers/{values['provider']}", {}),
+        ("providers.filtered", "/providers-filtered", {"organization_name": values["organization_name"]}),
+        ("providers.search", "/providers-search", {"q": values["organization_name"][:6]}),
+        ("descriptions", "/descriptions", {}),
+        ("description", f"/descriptions/{values['description']}", {}),
+        ("descriptions.filtered", "/descriptions-filtered", {"furniture_type": values["furniture_type"]}),
+        ("descriptions.search", "/descriptions-search", {"q": values["furniture_type"][:3]}),
+        ("sales", "/sales-accounting", {}),
+        ("sale", f"/sales-accounting/{values['sale']}", {}),
+        ("stocks", "/stocks-accounting", {}),
+        ("stock", f"/stock-accounting/{values['stock']}", {}),
+        ("storekeeper.products", "/storekeeper/products-info", {}),
+        ("storekeeper.products.filtered", "/storekeeper/products-info-filtered",
+         {"furniture_type": values["furniture_type"]}),
+        ("storekeeper.sales", "/storekeeper/sales-info", {}),
+        ("storekeeper.stocks", "/storekeeper/stocks-info", {}),
+        ("storekeeper.orders", "/storekeeper/orders-info", {}),
+        ("storekeeper.providers", "/storekeeper/providers-info", {}),
+    ]
+
+    return [(name, path, params) for name, path, params in routes if None not in params.values()]
+
+
+def write_endpoints(values: dict) -> list[tuple[str, type, str, Callable[[int], dict], Callable[[int], dict]]]:
+    today = datetime.datetime.now().replace(microsecond=0)
+
+    def day(i: int) -> str:
+        # Alternating the date moves a sale between rollup rows, the same work a real correction does.
+        return (today - datetime.timedelta(days=i % 2)).isoformat()
+
+    return [
+        ("products", Product, "/products",
+         lambda i: {"price": 100.0, "stock": 1000, "provider_id": values["provider"],
+                    "description_id": values["description"]},
+         lambda i: {"price": 100.0 + i % 2}),
+        ("stocks", StockRecord, "/stocks-accounting",
+         lambda i: {"date": day(0), "product_id": values["stocked_product"], "quantity": 1},
+         lambda i: {"quantity": 1 + i % 2}),
+        ("orders", Order, "/orders",
+         lambda i: {"product_id": values["stocked_product"], "product_quantity": 1, "total_cost": 100.0},
+         lambda i: {"product_quantity": 1 + i % 2}),
+        ("sales", SalesRecord, "/sales-accounting",
+         lambda i: {"date": day(0), "order_id": values["order"], "buyer_id": values["buyer"]},
+         lambda i: {"date": day(i)}),
+    ]
+
+
+def summarize(timings: list[float], errors: int) -> dict:
+    timings = sorted(timings)
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[max(int(len(timings) * 0.95) - 1, 0)], 3),
+        "p99_ms": round(timings[max(int(len(timings) * 0.99) - 1, 0)], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+async def measure(client: httpx.AsyncClient, path: str, params: dict, headers: dict,
+                  iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await client.get(path, params=params, headers=headers)
+
+    timings, errors = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = await client.get(path, params=params, headers=headers)
+        await response.aread()
+        timings.append((time.perf_counter() - start) * 1000)
+        errors += response.status_code >= 400
+
+    return summarize(timings, errors)
+
+
+async def measure_writes(client: httpx.AsyncClient, requests: list[tuple[str, str, Optional[dict]]],
+                         warmup: int) -> dict:
+    timings, errors = [], 0
+    for number, (method, path, body) in enumerate(requests):
+        start = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        await response.aread()
+        if number >= warmup:
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code >= 400
+
+    return summarize(timings, errors)
+
+
+async def ids_after(model, after: Optional[int]) -> list[int]:
+    async with engine.session_factory() as session:
+        query = select(model.id).order_by(model.id)
+        if after is not None:
+            query = query.where(model.id > after)
+        return list((await session.execute(query)).scalars())
+
+
+async def measure_lifecycle(client: httpx.AsyncClient, name: str, model, path: str, create: Callable[[int], dict],
+                            update: Callable[[int], dict], iterations: int, warmup: int) -> dict:
+    count = warmup + iterations
+    async with engine.session_factory() as session:
+        after = (await session.execute(select(func.max(model.id)))).scalar()
+
+    # Every PUT, PATCH and DELETE targets a row this run created, and the DELETEs remove all of them again.
+    results = {}
+    try:
+        results[f"{name}.post"] = await measure_writes(client, [("POST", path, create(i)) for i in range(count)], warmup)
+        ids = await ids_after(model, after)
+        if not ids:
+            return results
+
+        results[f"{name}.put"] = await measure_writes(
+            client, [("PUT", f"{path}/{ids[i % len(ids)]}", update(i)) for i in range(count)], warmup)
+        if model is Product:
+            results["storekeeper.products.patch"] = await measure_writes(
+                client, [("PATCH", "/storekeeper/products", {"id": ids[i % len(ids)], "count": 500 + i % 2})
+                         for i in range(count)], warmup)
+        results[f"{name}.delete"] = await measure_writes(
+            client, [("DELETE", f"{path}/{id}", None) for id in ids], min(warmup, len(ids) - 1))
+    finally:
+        # Deleting through the API also undoes the stock and rollup changes of anything left over.
+        for id in await ids_after(model, after):
+            await client.delete(f"{path}/{id}")
+
+    return results
+
+
+def print_stats(name: str, stats: dict) -> None:
+    print(f"{name:<36}p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  errors={stats['errors']}")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def table_counts() -> dict:
+    async with engine.session_factory() as session:
+        return {model.__tablename__: (await session.execute(select(func.count()).select_from(model))).scalar()
+                for model in (Description, Provider, Buyer, Product, Order, SalesRecord, StockRecord)}
+
+
+async def login(client: httpx.AsyncClient, password: str) -> None:
+    response = await client.post("/token", headers=JSON, data={"username": "storekeeper", "password": password})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+
+async def run(base_url: str, iterations: int, warmup: int, only: list[str], password: str, writes: bool) -> dict:
+    values = await sample_values()
+
+    if base_url:
+        transport = None
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        await login(client, password)
+
+        for name, path, params in endpoints(values):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+
+            for suffix, headers in (("", {}), (".json", JSON)):
+                if path.endswith("-search") and suffix:
+                    continue
+                results[name + suffix] = await measure(client, path, params, headers, iterations, warmup)
+                print_stats(name + suffix, results[name + suffix])
+
+        for name, model, path, create, update in write_endpoints(values) if writes else []:
+            if only and not any(name.startswith(prefix) or prefix.startswith(name) for prefix in only):
+                continue
+
+            lifecycle = await measure_lifecycle(client, name, model, path, create, update, iterations, warmup)
+            for write_name, stats in lifecycle.items():
+                results[write_name] = stats
+                print_stats(write_name, stats)
+
+    return {
+        "meta": {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "target": base_url,
+            "iterations": iterations,
+            "tables": await table_counts(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    regressions = 0
+    print(f"{'endpoint':<36}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+
+    for name, stats in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<36}{'-':>14}{stats['p50_ms']:>14.2f}{'new':>10}")
+            continue
+
+        change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        regressed = change > threshold
+        regressions += regressed
+        print(f"{name:<36}{before['p50_ms']:>14.2f}{stats['p50_ms']:>14.2f}{change:>+9.1f}%"
+              + ("  REGRESSION" if regressed else ""))
+
+    return 1 if regressions else 0
+
+
+async def main(args) -> int:
+    report = await run(args.base_url, args.iterations, args.warmup, args.only, args.password, not args.skip_writes)
+    await engine.dispose()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            return compare(json.load(file), report, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every endpoint against a local database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="benchmark the endpoints and store the results as JSON")
+    run_parser.add_argument("--base-url", default="", help="benchmark a running server instead of the app in-process")
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--only", nargs="*", default=[], help="endpoint name prefixes to run")
+    run_parser.add_argument("--skip-writes", action="store_true",
+                            help="only time reads, for a database that must not be written to")
+    run_parser.add_argument("--password", default=settings.STOREKEEPER_PASSWORD, help="storekeeper password")
+    run_parser.add_argument("--output", default="benchmark-results.json")
+    run_parser.add_argument("--baseline", help="results file to compare the new run against")
+    run_parser.add_argument("--threshold", type=float, default=10, help="p50 regression threshold in percent")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two stored result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="p50 regression threshold in percent")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as baseline, open(args.current, encoding="utf-8") as current:
+            sys.exit(compare(json.load(baseline), json.load(current), args.threshold))
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import datetime
+import statistics
+import time
+
+from sqlalchemy import delete, event, func, select
+
+from app.models.base import Product, StockRecord
+from app.models.db_engine import engine
+from app.routers.stock_records import add_stocks_accounting, add_stocks_bulk
+from app.schemas.base import StockRecordRequest
+from app.utils.crud import update_returning
+from app.utils.idempotency import Idempotency
+from app.utils.stock import set_stocks
+
+
+async def select_mutate_refresh(session, id: int, price: float) -> None:
+    result = await session.execute(select(Product).where(Product.id == id))
+    product = result.scalar_one_or_none()
+    product.price = price
+
+    await session.commit()
+    await session.refresh(product)
+
+
+async def update_returning_commit(session, id: int, price: float) -> None:
+    await update_returning(session, Product, id, {"price": price})
+    await session.commit()
+
+
+async def measure(write, id: int, price: float, iterations: int, warmup: int) -> dict:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    # Alternate the price so the ORM path cannot skip its UPDATE as a no-op; the last write restores it.
+    for i in range(warmup):
+        async with engine.session_factory() as session:
+            await write(session, id, price + i % 2)
+
+    timings = []
+    event.listen(engine.engine.sync_engine, "before_cursor_execute", count)
+    try:
+        for i in range(iterations):
+            async with engine.session_factory() as session:
+                start = time.perf_counter()
+                await write(session, id, price + i % 2)
+                timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        event.remove(engine.engine.sync_engine, "before_cursor_execute", count)
+
+        async with engine.session_factory() as session:
+            await update_returning_commit(session, id, price)
+
+    timings.sort()
+    return {
+        "statements_per_write": statements / iterations,
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+async def per_row_receipts(stocks: list[StockRecordRequest]) -> None:
+    for stock in stocks:
+        async with engine.session_factory() as session:
+            await add_stocks_accounting(stock, Idempotency(None, ""), session)
+
+
+async def bulk_receipts(stocks: list[StockRecordRequest]) -> None:
+    async with engine.session_factory() as session:
+        await add_stocks_bulk(stocks, session, [])
+
+
+async def measure_receipts(rows: int) -> None:
+    async with engine.session_factory() as session:
+        counts = dict((await session.execute(select(Product.id, Product.stock).order_by(Product.id).limit(100))).all())
+        last_id = (await session.execute(select(func.max(StockRecord.id)))).scalar() or 0
+
+    date = datetime.datetime.now()
+    product_ids = list(counts)
+    stocks = [StockRecordRequest(date=date, product_id=product_ids[i % len(product_ids)], quantity=1)
+              for i in range(rows)]
+
+    timings = {}
+    try:
+        for write in (per_row_receipts, bulk_receipts):
+            start = time.perf_counter()
+            await write(stocks)
+            timings[write.__name__] = (time.perf_counter() - start) * 1000
+    finally:
+        # Both runs only add receipts past last_id and stock on these products, so this restores the data.
+        async with engine.session_factory() as session:
+            await session.execute(delete(StockRecord).where(StockRecord.id > last_id))
+            await set_stocks(session, counts)
+            await session.commit()
+
+    for name, elapsed in timings.items():
+        print(f"{name:<26}rows={rows}  total_ms={elapsed:.1f}  per_row_ms={elapsed / rows:.3f}")
+    print(f"{'speedup':<26}{timings['per_row_receipts'] / timings['bulk_receipts']:.1f}x")
+
+
+async def main(id: int, iterations: int, warmup: int, bulk_rows: int) -> None:
+    async with engine.session_factory() as session:
+        price = (await session.execute(select(Product.price).where(Product.id == id))).scalar_one()
+
+    for write in (select_mutate_refresh, update_returning_commit):
+        stats = await measure(write, id, price, iterations, warmup)
+        print(f"{write.__name__:<26}" + "  ".join(f"{key}={value:.3f}" for key, value in stats.items()))
+
+    if bulk_rows:
+        await measure_receipts(bulk_rows)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PUT /products/{id} write paths and per-row against bulk stock receipts "
+                                                 "against a live database")
+    parser.add_argument("--product-id", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--bulk-rows", type=int, default=10_000, help="stock receipts per run, 0 skips the comparison")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.product_id, args.iterations, args.warmup, args.bulk_rows))
@@ -0,0 +1,40 @@
+"""filter and foreign key indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_Описание_тип_мебели_код", "Описание", ["тип_мебели", "код"]),
+    ("ix_Покупатель_ФИО_код", "Покупатель", ["ФИО", "код"]),
+    ("ix_Поставщик_имя_организации_код", "Поставщик", ["имя_организации", "код"]),
+    ("ix_Товар_код_описания", "Товар", ["код_описания"]),
+    ("ix_Товар_код_поставщика", "Товар", ["код_поставщика"]),
+    ("ix_Заказ_код_товара", "Заказ", ["код_товара"]),
+    ("ix_Учёт_продаж_код_заказа", "Учёт_продаж", ["код_заказа"]),
+    ("ix_Учёт_продаж_код_покупателя", "Учёт_продаж", ["код_покупателя"]),
+    ("ix_Учёт_поставок_код_товара", "Учёт_поставок", ["код_товара"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
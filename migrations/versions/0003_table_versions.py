@@ -0,0 +1,50 @@
+"""per-table change versions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["Описание", "Покупатель", "Поставщик", "Товар", "Заказ", "Учёт_продаж", "Учёт_поставок"]
+
+
+def upgrade() -> None:
+    versions = op.create_table(
+        "Версия_таблицы",
+        sa.Column("таблица", sa.String(), primary_key=True),
+        sa.Column("версия", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.bulk_insert(versions, [{"таблица": table, "версия": 0} for table in TABLES])
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO "Версия_таблицы" ("таблица", "версия") VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT ("таблица") DO UPDATE SET "версия" = "Версия_таблицы"."версия" + 1;
+            RETURN NULL;
+        END
+        $$
+    """)
+
+    # Statement-level, so a bulk COPY or multi-row UPDATE bumps the version once.
+    for table in TABLES:
+        op.execute(f'CREATE TRIGGER "{table}_version" AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}" '
+                   f'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS "{table}_version" ON "{table}"')
+
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table("Версия_таблицы")
@@ -0,0 +1,41 @@
+"""daily sales rollup
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "Сводка_продаж",
+        sa.Column("дата", sa.Date(), nullable=False),
+        sa.Column("код_товара", sa.Integer(), nullable=False),
+        sa.Column("код_покупателя", sa.Integer(), nullable=False),
+        sa.Column("количество", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("выручка", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("продажи", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("дата", "код_товара", "код_покупателя"),
+    )
+
+    op.execute("""
+        INSERT INTO "Сводка_продаж" ("дата", "код_товара", "код_покупателя", "количество", "выручка", "продажи")
+        SELECT s."дата", o."код_товара", s."код_покупателя", sum(o."количество_товаров"), sum(o."сумма"), count(*)
+        FROM "Учёт_продаж" s
+        JOIN "Заказ" o ON o."код" = s."код_заказа"
+        GROUP BY s."дата", o."код_товара", s."код_покупателя"
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("Сводка_продаж")
@@ -0,0 +1,27 @@
+"""row versions for optimistic locking
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant server default is a catalog-only change, existing rows are not rewritten.
+    op.add_column("Товар", sa.Column("версия", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("Заказ", sa.Column("версия", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    op.drop_column("Заказ", "версия")
+    op.drop_column("Товар", "версия")
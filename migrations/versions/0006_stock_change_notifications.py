@@ -0,0 +1,49 @@
+"""stock change notifications
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["Товар", "Учёт_продаж", "Учёт_поставок"]
+
+
+def upgrade() -> None:
+    # The rows of these tables are a handful of scalars, far below the 8000 byte NOTIFY payload limit.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_stock_change() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            changed record;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+            ELSE
+                changed := NEW;
+            END IF;
+
+            PERFORM pg_notify('stock_changes',
+                              json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'row', to_jsonb(changed))::text);
+            RETURN NULL;
+        END
+        $$
+    """)
+
+    for table in TABLES:
+        op.execute(f'CREATE TRIGGER "{table}_notify" AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+                   f'FOR EACH ROW EXECUTE FUNCTION notify_stock_change()')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS "{table}_notify" ON "{table}"')
+
+    op.execute("DROP FUNCTION IF EXISTS notify_stock_change()")
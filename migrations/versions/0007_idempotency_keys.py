@@ -0,0 +1,33 @@
+"""idempotency keys
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "Ключ_идемпотентности",
+        sa.Column("ключ", sa.String(), primary_key=True),
+        sa.Column("отпечаток_запроса", sa.String(), nullable=False),
+        sa.Column("код_ответа", sa.Integer(), nullable=False),
+        sa.Column("ответ", sa.String(), nullable=False),
+        sa.Column("создан", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_Ключ_идемпотентности_создан", "Ключ_идемпотентности", ["создан"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_Ключ_идемпотентности_создан", table_name="Ключ_идемпотентности")
+    op.drop_table("Ключ_идемпотентности")
@@ -0,0 +1,73 @@
+"""bump table versions once per transaction at commit
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One marker row per writing transaction; its deferred trigger runs the bump at commit.
+    op.execute('CREATE UNLOGGED TABLE "Ожидающие_версии" ("код" bigserial PRIMARY KEY)')
+
+    # The statement triggers only note the table in a transaction-local setting, so writers no longer lock
+    # the counter rows in the order they happen to touch the tables.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            touched text := coalesce(current_setting('app.touched_tables', true), '');
+        BEGIN
+            IF touched = '' THEN
+                INSERT INTO "Ожидающие_версии" DEFAULT VALUES;
+                PERFORM set_config('app.touched_tables', TG_TABLE_NAME, true);
+            ELSIF NOT TG_TABLE_NAME = ANY(string_to_array(touched, ',')) THEN
+                PERFORM set_config('app.touched_tables', touched || ',' || TG_TABLE_NAME, true);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+
+    # Sorted, so two committing transactions always take the counter rows in the same order.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION flush_table_versions() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO "Версия_таблицы" ("таблица", "версия")
+            SELECT touched, 1
+            FROM unnest(string_to_array(current_setting('app.touched_tables', true), ',')) AS touched
+            ORDER BY touched
+            ON CONFLICT ("таблица") DO UPDATE SET "версия" = "Версия_таблицы"."версия" + 1;
+
+            PERFORM set_config('app.touched_tables', '', true);
+            DELETE FROM "Ожидающие_версии" WHERE "код" = NEW."код";
+            RETURN NULL;
+        END
+        $$
+    """)
+
+    op.execute('CREATE CONSTRAINT TRIGGER "Ожидающие_версии_flush" AFTER INSERT ON "Ожидающие_версии" '
+               'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION flush_table_versions()')
+
+
+def downgrade() -> None:
+    op.execute('DROP TABLE IF EXISTS "Ожидающие_версии"')
+    op.execute("DROP FUNCTION IF EXISTS flush_table_versions()")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO "Версия_таблицы" ("таблица", "версия") VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT ("таблица") DO UPDATE SET "версия" = "Версия_таблицы"."версия" + 1;
+            RETURN NULL;
+        END
+        $$
+    """)